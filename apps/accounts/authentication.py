@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from drf_spectacular.plumbing import build_bearer_security_scheme_object
+from rest_framework import authentication, exceptions
+
+from apps.accounts.models import User
+
+TOKEN_SALT = "apps.accounts.authentication"
+TOKEN_KEYWORD = "Bearer"
+
+
+def get_user_cache():
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def make_user_key(pk):
+    return f"auth:user:{pk}"
+
+
+def get_token_stamp(user):
+    # Changes with the password, so a new password revokes the old tokens
+    return user.get_session_auth_hash()[:16]
+
+
+def make_token(user):
+    """
+    Returns a signed token of the user, valid for AUTH_TOKEN_MAX_AGE seconds
+    """
+    return signing.dumps(
+        {"id": user.pk, "stamp": get_token_stamp(user)}, salt=TOKEN_SALT
+    )
+
+
+def evict_user(pk):
+    get_user_cache().delete(make_user_key(pk))
+
+
+def get_cached_user(pk):
+    """
+    Returns the user from the cache, or from the database on a miss
+
+    The user is cached for AUTH_TOKEN_USER_CACHE_TIMEOUT seconds and
+    evicted by the signals of User once the write commits, so a deactivated
+    user is refused at once; writes that bypass the signals take effect
+    within the timeout.
+    """
+    cache = get_user_cache()
+    key = make_user_key(pk)
+
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.filter(pk=pk).first()
+        if user is None:
+            return None
+        cache.set(key, user, settings.AUTH_TOKEN_USER_CACHE_TIMEOUT)
+    return user
+
+
+def authenticate_token(token):
+    """
+    Returns the user of a token or raises AuthenticationFailed
+
+    The signature and the age are checked without the database, and the
+    user comes from get_cached_user, so a request with a valid token does
+    no query in the common case.
+    """
+    try:
+        payload = signing.loads(
+            token, salt=TOKEN_SALT, max_age=settings.AUTH_TOKEN_MAX_AGE
+        )
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed("Token has expired.")
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed("Invalid token.")
+
+    user = get_cached_user(payload["id"])
+    if user is None or not user.is_active:
+        raise exceptions.AuthenticationFailed("User inactive or deleted.")
+    if not constant_time_compare(payload["stamp"], get_token_stamp(user)):
+        raise exceptions.AuthenticationFailed("Token has been revoked.")
+    return user
+
+
+def get_authorization_token(request):
+    """
+    Returns the token of an ``Authorization: Bearer <token>`` header, None
+    when the request has no such header
+    """
+    parts = request.headers.get("Authorization", "").split()
+    if not parts or parts[0] != TOKEN_KEYWORD:
+        return None
+    if len(parts) != 2:
+        raise exceptions.AuthenticationFailed("Invalid token header.")
+    return parts[1]
+
+
+class TokenAuthentication(authentication.BaseAuthentication):
+    """
+    Stateless signed tokens issued by /accounts/token/
+
+        Authorization: Bearer <token>
+
+    The token holds the id of the user and a stamp of the password hash,
+    signed with SECRET_KEY. Unlike sessions it needs no table of its own.
+    """
+
+    def authenticate(self, request):
+        token = get_authorization_token(request)
+        if token is None:
+            return None
+        return authenticate_token(token), token
+
+    def authenticate_header(self, request):
+        return TOKEN_KEYWORD
+
+
+class TokenAuthenticationScheme(OpenApiAuthenticationExtension):
+    target_class = "apps.accounts.authentication.TokenAuthentication"
+    name = "tokenAuth"
+
+    def get_security_definition(self, auto_schema):
+        return build_bearer_security_scheme_object(
+            header_name="Authorization", token_prefix=TOKEN_KEYWORD
+        )
@@ -0,0 +1,102 @@
+from django.db import IntegrityError, transaction
+
+from apps.accounts.hashing import hash_passwords
+from apps.accounts.models import User
+from apps.accounts.serializers import BulkCreateUserSerializer
+
+BULK_BATCH_SIZE = 1000
+BULK_MAX_USERS = 5000
+
+
+def check_users(valid):
+    """
+    Splits validated items into the ones that can be written and the errors
+    of the emails already taken
+
+    The taken emails are read once for the whole list, the first item with
+    an email wins over the later ones.
+    """
+    emails = [data["email"] for _, data in valid]
+    taken_emails = set()
+    for start in range(0, len(emails), BULK_BATCH_SIZE):
+        taken_emails.update(
+            User.objects.filter(
+                email__in=emails[start : start + BULK_BATCH_SIZE]
+            ).values_list("email", flat=True)
+        )
+
+    accepted = []
+    errors = []
+    for index, data in valid:
+        if data["email"] in taken_emails:
+            errors.append(
+                {
+                    "index": index,
+                    "errors": {"email": ["user with this E-mail already exists."]},
+                }
+            )
+        else:
+            taken_emails.add(data["email"])
+            accepted.append((index, data))
+
+    return accepted, errors
+
+
+def create_users(items):
+    """
+    Creates users from a list of payloads
+
+    Every item is validated on its own and the emails already taken are
+    looked up once for the whole list, so invalid items are reported
+    without aborting the others. The passwords of the valid ones are
+    hashed on a pool of processes and the users are written with batched
+    INSERTs in one transaction. When a concurrent request takes an email
+    after the lookup, the transaction is rolled back, the lookup is
+    repeated for the accepted items and the rest is written again.
+
+    Returns a tuple of (created, errors), both lists of dicts with the
+    index of the item in the payload.
+    """
+    errors = []
+    valid = []
+
+    for index, item in enumerate(items):
+        serializer = BulkCreateUserSerializer(data=item)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            data["email"] = User.objects.normalize_email(data["email"])
+            valid.append((index, data))
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+
+    accepted, conflicts = check_users(valid)
+    errors.extend(conflicts)
+
+    hashes = hash_passwords(data["password"] for _, data in accepted)
+    accepted = [
+        (index, {**data, "password": password})
+        for (index, data), password in zip(accepted, hashes)
+    ]
+
+    while True:
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    [User(**data) for _, data in accepted],
+                    batch_size=BULK_BATCH_SIZE,
+                )
+            break
+        except IntegrityError:
+            # Every retry drops at least one item, anything else is re-raised
+            accepted, conflicts = check_users(accepted)
+            if not conflicts:
+                raise
+            errors.extend(conflicts)
+
+    created = [
+        {"index": index, "id": user.pk, "email": user.email}
+        for (index, _), user in zip(accepted, users)
+    ]
+    errors.sort(key=lambda error: error["index"])
+
+    return created, errors
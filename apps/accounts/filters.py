@@ -0,0 +1,21 @@
+import django_filters
+from django.db.models import Q
+
+from apps.accounts.models import ACCOUNT_TYPE_CHOICES, User
+
+
+class ProfileFilter(django_filters.FilterSet):
+    role = django_filters.ChoiceFilter(choices=ACCOUNT_TYPE_CHOICES)
+    is_active = django_filters.BooleanFilter()
+    email = django_filters.CharFilter(lookup_expr="istartswith")
+    name = django_filters.CharFilter(method="filter_name")
+
+    class Meta:
+        model = User
+        fields = ["role", "is_active", "email"]
+
+    def filter_name(self, queryset, name, value):
+        # Each side is served by the prefix index of its column
+        return queryset.filter(
+            Q(first_name__istartswith=value) | Q(last_name__istartswith=value)
+        )
@@ -0,0 +1,53 @@
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+_executor = None
+
+
+def get_worker_count():
+    workers = settings.PASSWORD_HASHING_WORKERS
+    if workers is None:
+        return os.cpu_count() or 1
+    return workers
+
+
+def get_executor():
+    """
+    Returns the pool of processes shared by the hashing calls of this
+    process, started on first use
+
+    The workers are spawned rather than forked, forking a threaded server
+    is unsafe. They only need the settings, read from DJANGO_SETTINGS_MODULE.
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=get_worker_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        atexit.register(_executor.shutdown)
+    return _executor
+
+
+def hash_passwords(passwords):
+    """
+    Returns the hashes of the passwords, in the same order, computed on
+    the pool of processes in parallel
+
+    Hashing is made slow on purpose and holds the GIL, so in the worker
+    process the hashes of a large list would be computed one by one.
+    A single password or PASSWORD_HASHING_WORKERS = 0 hashes in place.
+    """
+    passwords = list(passwords)
+    workers = get_worker_count()
+    if len(passwords) < 2 or workers < 1:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(get_executor().map(make_password, passwords, chunksize=chunksize))
@@ -0,0 +1,55 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.bulk import BULK_MAX_USERS, create_users
+from core.commands import guess_format
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the users of a CSV or NDJSON file with first_name, last_name, "
+        "email, password and an optional role. The passwords are hashed on a "
+        "pool of processes and the users inserted in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Format of the file, guessed from its extension by default",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"{path} does not exist")
+
+        file_format = options["format"] or guess_format(path)
+        created = 0
+        failed = 0
+
+        with open(path, newline="", encoding="utf-8") as file:
+            if file_format == "csv":
+                records = csv.DictReader(file)
+            else:
+                records = (json.loads(line) for line in file if line.strip())
+
+            offset = 0
+            while chunk := list(islice(records, BULK_MAX_USERS)):
+                users, errors = create_users(chunk)
+                created += len(users)
+                failed += len(errors)
+                for error in errors:
+                    self.stderr.write(
+                        f"Record {offset + error['index'] + 1}: {error['errors']}"
+                    )
+                offset += len(chunk)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"users created: {created}, rejected: {failed}")
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:42
+
+import core.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_is_staff'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'is_active', 'id'], name='user_role_active'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['id'], name='user_inactive'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=core.indexes.PrefixIndex('email', name='user_email_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=core.indexes.PrefixIndex('first_name', name='user_first_name_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=core.indexes.PrefixIndex('last_name', name='user_last_name_prefix'),
+        ),
+    ]
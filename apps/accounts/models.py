@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractBaseUser
 from apps.accounts.managers import CustomUserManager
+from core.indexes import PrefixIndex
 
 ACCOUNT_TYPE_CHOICES = (
     ("SUPERUSER", "SUPERUSER"),
@@ -39,6 +41,18 @@ class User(AbstractBaseUser):
 
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            # The filters of the profiles list, paged by id
+            models.Index(fields=["role", "is_active", "id"], name="user_role_active"),
+            models.Index(
+                fields=["id"], condition=Q(is_active=False), name="user_inactive"
+            ),
+            PrefixIndex("email", name="user_email_prefix"),
+            PrefixIndex("first_name", name="user_first_name_prefix"),
+            PrefixIndex("last_name", name="user_last_name_prefix"),
+        ]
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -0,0 +1,37 @@
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+
+from core.pagination import CURSOR_PARAM_EXAMPLE
+from core.streaming import STREAM_PARAM_EXAMPLE
+
+PROFILES_PARAM_EXAMPLE = (
+    [
+        OpenApiParameter(
+            name="role",
+            description="Filtering users by role",
+            required=False,
+            type=OpenApiTypes.STR,
+            enum=["SUPERUSER", "RESP"],
+        ),
+        OpenApiParameter(
+            name="is_active",
+            description="Filtering users by activity",
+            required=False,
+            type=OpenApiTypes.BOOL,
+        ),
+        OpenApiParameter(
+            name="email",
+            description="Filtering users by the beginning of the email, case-insensitive",
+            required=False,
+            type=OpenApiTypes.STR,
+        ),
+        OpenApiParameter(
+            name="name",
+            description="Filtering users by the beginning of the first or the last name, "
+            "case-insensitive",
+            required=False,
+            type=OpenApiTypes.STR,
+        ),
+    ]
+    + CURSOR_PARAM_EXAMPLE
+    + STREAM_PARAM_EXAMPLE
+)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.accounts.models import User
+from core.serializers import SparseFieldsetMixin
 
 
 class CreateUserSerializer(serializers.ModelSerializer):
@@ -8,13 +9,33 @@ class CreateUserSerializer(serializers.ModelSerializer):
         fields = ("first_name", "last_name", "email", "password")
 
 
+class BulkCreateUserSerializer(serializers.ModelSerializer):
+    """
+    Validates one user of a bulk payload, the uniqueness of the email is
+    checked for the whole payload at once
+    """
+
+    class Meta:
+        model = User
+        fields = ("first_name", "last_name", "email", "password", "role")
+        extra_kwargs = {"email": {"validators": []}}
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         exclude = ["password"]
 
+    def update(self, instance, validated_data):
+        # Only the sent fields are written, so a stale instance (the cached
+        # request.user) can't bring back an old password or is_active
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
 
-class ResponsibleSerializer(serializers.ModelSerializer):
+class ResponsibleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     This serializer needs for serialization
     responsibles of shops at /shops/ endpoint
@@ -23,3 +44,8 @@ class ResponsibleSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         exclude = ["last_login", "password", "is_staff", "avatar"]
+
+
+class TokenObtainSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    password = serializers.CharField(write_only=True, trim_whitespace=False)
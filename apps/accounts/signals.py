@@ -0,0 +1,16 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.authentication import evict_user
+from apps.accounts.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_token_user(sender, instance, **kwargs):
+    # Deactivation and password changes apply to the tokens at once. Evicted
+    # after the commit, or a concurrent request could cache the old row again
+    transaction.on_commit(partial(evict_user, instance.pk), using=kwargs["using"])
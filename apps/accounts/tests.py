@@ -1,6 +1,14 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+from apps.accounts.authentication import get_user_cache, make_user_key
+from apps.accounts.bulk import check_users
 from apps.accounts.models import User
 from apps.accounts.serializers import (
     CreateUserSerializer,
@@ -8,7 +16,12 @@ from apps.accounts.serializers import (
     ResponsibleSerializer,
 )
 
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 
@@ -59,9 +72,115 @@ class RegisterAccountAPITestCase(APITestCase):
             "password": "test",
         }
 
-        response = self.client.post(reverse("signup"), data)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse("signup"), data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+        writes = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(User.objects.get(email="test@ya.ru").check_password("test"))
+
+    def test_register_users_in_bulk(self):
+        payload = [
+            {
+                "first_name": "first",
+                "last_name": "bulk",
+                "email": "first@bulk.ru",
+                "password": "pass1",
+            },
+            {
+                "first_name": "taken",
+                "last_name": "bulk",
+                "email": "email@email.ru",
+                "password": "pass2",
+            },
+            {"first_name": "invalid", "last_name": "bulk", "email": "not-an-email"},
+            {
+                "first_name": "second",
+                "last_name": "bulk",
+                "email": "second@bulk.ru",
+                "password": "pass3",
+                "role": "SUPERUSER",
+            },
+            {
+                "first_name": "duplicate",
+                "last_name": "bulk",
+                "email": "first@bulk.ru",
+                "password": "pass4",
+            },
+        ]
+
+        response = self.client.post(reverse("signup-bulk"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual([item["index"] for item in response.data["created"]], [0, 3])
+        self.assertEqual(
+            [error["index"] for error in response.data["errors"]], [1, 2, 4]
+        )
+        self.assertTrue(User.objects.get(email="first@bulk.ru").check_password("pass1"))
+        self.assertEqual(User.objects.get(email="second@bulk.ru").role, "SUPERUSER")
+
+    def test_register_users_in_bulk_requires_list(self):
+        response = self.client.post(
+            reverse("signup-bulk"), {"email": "one@bulk.ru"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_register_users_in_bulk_reports_emails_taken_concurrently(self):
+        payload = [
+            {
+                "first_name": "first",
+                "last_name": "bulk",
+                "email": email,
+                "password": "pass",
+            }
+            for email in ["first@bulk.ru", "email@email.ru"]
+        ]
+        lookups = []
+
+        def stale_check(valid):
+            # The first lookup ran before "email@email.ru" was committed
+            lookups.append(valid)
+            if len(lookups) == 1:
+                return list(valid), []
+            return check_users(valid)
+
+        with mock.patch("apps.accounts.bulk.check_users", stale_check):
+            response = self.client.post(reverse("signup-bulk"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual([item["index"] for item in response.data["created"]], [0])
+        [error] = response.data["errors"]
+        self.assertEqual(error["index"], 1)
+        self.assertIn("email", error["errors"])
+        self.assertTrue(User.objects.get(email="first@bulk.ru").check_password("pass"))
+
+
+class ProvisionUsersCommandTestCase(TestCase):
+    def test_provision_users_from_csv(self):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as file:
+            file.write(
+                "first_name,last_name,email,password\n"
+                "Anna,Ivanova,anna@shop.ru,secret1\n"
+                "Ivan,Petrov,ivan@shop.ru,secret2\n"
+                "Ivan,Petrov,ivan@shop.ru,secret3\n"
+            )
+        self.addCleanup(os.remove, file.name)
+
+        out = StringIO()
+        call_command("provision_users", file.name, stdout=out, stderr=StringIO())
+
+        self.assertIn("users created: 2, rejected: 1", out.getvalue())
+        self.assertTrue(
+            User.objects.get(email="ivan@shop.ru").check_password("secret2")
+        )
+
 
 class ProfileAPITestCase(APITestCase):
     def setUp(self):
@@ -118,9 +237,92 @@ class ProfilesAPITestCase(APITestCase):
         )
         self.client.login(email="test@test.ru", password="test")
 
+    def create_responsibles(self):
+        return [
+            User.objects.create_responsible(
+                first_name=first_name,
+                last_name=last_name,
+                email=email,
+                password="test",
+            )
+            for first_name, last_name, email in [
+                ("Anna", "Smirnova", "anna@shop.ru"),
+                ("Ivan", "Annenkov", "ivan@shop.ru"),
+                ("Olga", "Petrova", "olga@market.ru"),
+            ]
+        ]
+
+    def get_emails(self, params):
+        response = self.client.get(reverse("profiles"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [user["email"] for user in response.data["results"]]
+
     def test_get_all_profiles(self):
         response = self.client.get(reverse("profiles"))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertNotIn("password", response.data["results"][0])
+
+    def test_paginate_profiles_by_id(self):
+        self.create_responsibles()
+
+        response = self.client.get(reverse("profiles"), {"page_size": 2})
+        self.assertEqual(
+            [user["email"] for user in response.data["results"]],
+            ["test@test.ru", "anna@shop.ru"],
+        )
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [user["email"] for user in response.data["results"]],
+            ["ivan@shop.ru", "olga@market.ru"],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_filter_profiles(self):
+        olga = self.create_responsibles()[-1]
+        olga.is_active = False
+        olga.save()
+
+        self.assertEqual(self.get_emails({"role": "SUPERUSER"}), ["test@test.ru"])
+        self.assertEqual(
+            self.get_emails({"role": "RESP", "is_active": "true"}),
+            ["anna@shop.ru", "ivan@shop.ru"],
+        )
+        self.assertEqual(self.get_emails({"is_active": "false"}), ["olga@market.ru"])
+        self.assertEqual(self.get_emails({"email": "OLGA@"}), ["olga@market.ru"])
+        # Matches the beginning of the first or the last name, not the middle
+        self.assertEqual(
+            self.get_emails({"name": "ann"}), ["anna@shop.ru", "ivan@shop.ru"]
+        )
+        self.assertEqual(self.get_emails({"name": "mirn"}), [])
+
+    def test_filter_profiles_by_unknown_role(self):
+        response = self.client.get(reverse("profiles"), {"role": "ADMIN"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("role", response.data)
+
+    def test_stream_filtered_profiles(self):
+        self.create_responsibles()
+
+        response = self.client.get(
+            reverse("profiles"), {"email": "olga"}, HTTP_ACCEPT="application/x-ndjson"
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["email"] for line in lines], ["olga@market.ru"]
+        )
+
+    def test_stream_profiles_as_ndjson(self):
+        response = self.client.get(
+            reverse("profiles"), HTTP_ACCEPT="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["email"], "test@test.ru")
 
 
 class MyProfileAPITestCase(APITestCase):
@@ -341,6 +543,116 @@ class MyProfilePermissionTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class TokenAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_responsible(
+            first_name="test_user",
+            last_name="test",
+            email="email@email.ru",
+            password="test",
+        )
+        get_user_cache().clear()
+
+    def obtain_token(self, password="test"):
+        return self.client.post(
+            reverse("token"), {"email": "email@email.ru", "password": password}
+        )
+
+    def authorize(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_token_authenticates_without_queries(self):
+        response = self.obtain_token()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.authorize(response.data["token"])
+
+        response = self.client.get(reverse("myprofile"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], "email@email.ru")
+
+        # The user is cached after the first request
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("myprofile"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse("async-shops"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_cache_is_not_the_detail_cache(self):
+        self.authorize(self.obtain_token().data["token"])
+        self.client.get(reverse("myprofile"))
+
+        caches[settings.DETAIL_CACHE_ALIAS].clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("myprofile"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_wrong_password_gets_no_token(self):
+        response = self.obtain_token(password="wrong")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("token", response.data)
+
+    def test_invalid_token_is_rejected(self):
+        token = self.obtain_token().data["token"]
+        self.authorize(token[:-1] + ("A" if token[-1] != "A" else "B"))
+
+        response = self.client.get(reverse("myprofile"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivation_revokes_tokens(self):
+        self.authorize(self.obtain_token().data["token"])
+        self.client.get(reverse("myprofile"))
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        response = self.client.get(reverse("myprofile"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("async-shops"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_tokens(self):
+        self.authorize(self.obtain_token().data["token"])
+        self.client.get(reverse("myprofile"))
+
+        self.user.set_password("new")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        response = self.client.get(reverse("myprofile"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_is_evicted_after_the_commit(self):
+        self.authorize(self.obtain_token().data["token"])
+        self.client.get(reverse("myprofile"))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+            # Until the commit the cached user is the committed one
+            self.assertIsNotNone(get_user_cache().get(make_user_key(self.user.pk)))
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.assertIsNone(get_user_cache().get(make_user_key(self.user.pk)))
+
+    def test_profile_patch_keeps_the_fields_it_was_not_sent(self):
+        self.authorize(self.obtain_token().data["token"])
+        self.client.get(reverse("myprofile"))
+
+        # A password change the cached request.user doesn't know about
+        User.objects.filter(pk=self.user.pk).update(password="changed")
+
+        response = self.client.patch(reverse("myprofile"), {"first_name": "New"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "New")
+        self.assertEqual(self.user.password, "changed")
+
+
 # Serializers testing
 class CreateUserSerializerTestCase(TestCase):
     def setUp(self):
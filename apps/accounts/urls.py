@@ -2,13 +2,17 @@ from django.urls import path
 
 from apps.accounts.views import (
     RegisterAPIView,
+    RegisterBulkAPIView,
     ProfileAPIView,
     ProfilesAPIView,
     MyProfileAPIView,
+    TokenAPIView,
 )
 
 urlpatterns = [
     path("signup/", RegisterAPIView.as_view(), name="signup"),
+    path("signup/bulk/", RegisterBulkAPIView.as_view(), name="signup-bulk"),
+    path("token/", TokenAPIView.as_view(), name="token"),
     path("profiles", ProfilesAPIView.as_view(), name="profiles"),
     path("profile/<str:email>/", ProfileAPIView.as_view(), name="profile"),
     path("myprofile/", MyProfileAPIView.as_view(), name="myprofile"),
@@ -1,10 +1,24 @@
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
 
+from apps.accounts.authentication import make_token
+from apps.accounts.bulk import BULK_MAX_USERS, create_users
+from apps.accounts.filters import ProfileFilter
 from apps.accounts.permissions import IsSuperUser
-from apps.accounts.serializers import CreateUserSerializer, ProfileSerializer
+from apps.accounts.serializers import (
+    BulkCreateUserSerializer,
+    CreateUserSerializer,
+    ProfileSerializer,
+    TokenObtainSerializer,
+)
 from apps.accounts.models import User
+from apps.accounts.schema_examples import PROFILES_PARAM_EXAMPLE
+from core.pagination import IdCursorPagination
+from core.streaming import get_stream_format, stream_response
 
 from drf_spectacular.utils import extend_schema
 
@@ -22,9 +36,8 @@ class RegisterAPIView(APIView):
         if serializer.is_valid():
             data = serializer.validated_data
 
-            new_user = User.objects.create(**data)
-            new_user.set_password(data["password"])
-            new_user.save()
+            # Hashed before the INSERT, so the user is written once
+            User.objects.create(**{**data, "password": make_password(data["password"])})
 
             return Response(
                 data={"message": "You've registered successfully!"}, status=201
@@ -36,6 +49,30 @@ class RegisterAPIView(APIView):
         )
 
 
+class RegisterBulkAPIView(APIView):
+    serializer_class = BulkCreateUserSerializer
+    permission_classes = [IsSuperUser]
+
+    @extend_schema(
+        summary="Registration in bulk",
+        description="This endpoint allows superuser to create up to "
+        f"{BULK_MAX_USERS} users at once and reports errors per item. "
+        "The passwords are hashed in parallel",
+        request=BulkCreateUserSerializer(many=True),
+    )
+    def post(self, request):
+        items = request.data
+
+        if not isinstance(items, list) or not 0 < len(items) <= BULK_MAX_USERS:
+            return Response(
+                data={"message": f"Send a list of 1 to {BULK_MAX_USERS} users!"},
+                status=400,
+            )
+
+        created, errors = create_users(items)
+        return Response(data={"created": created, "errors": errors}, status=200)
+
+
 class ProfileAPIView(APIView):
     serializer_class = ProfileSerializer
     permission_classes = [IsSuperUser]
@@ -95,16 +132,33 @@ class ProfileAPIView(APIView):
 class ProfilesAPIView(APIView):
     serializer_class = ProfileSerializer
     permission_classes = [IsSuperUser]
+    pagination_class = IdCursorPagination
 
     @extend_schema(
         operation_id="getting_profiles",
         summary="Retrieve the profiles",
-        description="This endpoint allows superuser to retrieve the profiles of users",
+        description="This endpoint allows superuser to retrieve the profiles of "
+        "users, filtered by role, activity and the beginning of the email or name",
+        parameters=PROFILES_PARAM_EXAMPLE,
     )
     def get(self, request):
-        users = User.objects.all()
-        serializer = self.serializer_class(users, many=True)
-        return Response(data=serializer.data, status=200)
+        # The hash is never serialized, there is no need to read it
+        users = User.objects.defer("password")
+
+        filterset = ProfileFilter(request.query_params, queryset=users)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=400)
+
+        stream_format = get_stream_format(request)
+        if stream_format:
+            return stream_response(
+                filterset.qs.order_by("id"), self.serializer_class, stream_format
+            )
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(filterset.qs, request, view=self)
+        serializer = self.serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class MyProfileAPIView(APIView):
@@ -138,3 +192,33 @@ class MyProfileAPIView(APIView):
         return Response(
             data={"message": "You don't have permission to do this!"}, status=403
         )
+
+
+class TokenAPIView(APIView):
+    serializer_class = TokenObtainSerializer
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(
+        summary="Obtain a token",
+        description="This endpoint exchanges the email and the password of a user "
+        "for a signed token, sent as Authorization: Bearer <token>. The token "
+        "stops working when the user is deactivated or changes the password",
+    )
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(data={"message": "Check your details!"}, status=400)
+
+        user = authenticate(
+            request,
+            email=serializer.validated_data["email"],
+            password=serializer.validated_data["password"],
+        )
+        if user is None:
+            return Response(data={"message": "Invalid email or password!"}, status=400)
+
+        return Response(
+            data={"token": make_token(user), "expires_in": settings.AUTH_TOKEN_MAX_AGE},
+            status=200,
+        )
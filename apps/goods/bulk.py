@@ -0,0 +1,250 @@
+from collections import defaultdict
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from apps.goods.inventory import InventoryDelta
+from apps.goods.models import Product, ShopProduct
+from apps.goods.serializers import (
+    BulkCreateShopProductSerializer,
+    BulkUpdateShopProductSerializer,
+)
+from apps.shop.models import Shop
+from core.cache import invalidate_details
+
+BULK_BATCH_SIZE = 1000
+# Every shop of a batch is one OR term of the lock query and SQLite caps the
+# depth of an expression at 1000
+BULK_UPDATE_BATCH_SIZE = 500
+BULK_MAX_ITEMS = 20000
+
+
+def batched(iterable, size=BULK_BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def check_shopproducts(valid):
+    """
+    Splits validated items into the ones that can be written and the errors
+    of the lookups that need the database
+
+    Existing shops and taken titles are read once for the whole list, the
+    first item with a title wins over the later ones.
+    """
+    shop_ids = {data["shop"] for _, data in valid}
+    titles = {data["product"]["title"] for _, data in valid}
+
+    existing_shops = set()
+    for batch in batched(shop_ids):
+        existing_shops.update(
+            Shop.objects.filter(id__in=batch).values_list("id", flat=True)
+        )
+
+    taken_titles = set()
+    for batch in batched(titles):
+        taken_titles.update(
+            Product.objects.filter(title__in=batch).values_list("title", flat=True)
+        )
+
+    accepted = []
+    errors = []
+    for index, data in valid:
+        title = data["product"]["title"]
+
+        if data["shop"] not in existing_shops:
+            errors.append(
+                {"index": index, "errors": {"shop": ["Shop does not exist."]}}
+            )
+        elif title in taken_titles:
+            errors.append(
+                {
+                    "index": index,
+                    "errors": {
+                        "product": {
+                            "title": ["product with this title already exists."]
+                        }
+                    },
+                }
+            )
+        else:
+            taken_titles.add(title)
+            accepted.append((index, data))
+
+    return accepted, errors
+
+
+def create_shopproducts(items):
+    """
+    Creates products and their shop offers from a list of payloads
+
+    Every item is validated on its own and the lookups that need the
+    database (existing shops, taken titles) are done once for the whole
+    list, so invalid items are reported without aborting the others.
+    The valid ones are written with batched INSERTs in one transaction.
+    When a concurrent request takes a title or deletes a shop after the
+    lookups, the transaction is rolled back, the lookups are repeated for
+    the accepted items and the rest is written again.
+
+    Returns a tuple of (created, errors), both lists of dicts with the
+    index of the item in the payload.
+    """
+    errors = []
+    valid = []
+
+    for index, item in enumerate(items):
+        serializer = BulkCreateShopProductSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+
+    accepted, conflicts = check_shopproducts(valid)
+    errors.extend(conflicts)
+
+    while True:
+        try:
+            with transaction.atomic():
+                products = Product.objects.bulk_create(
+                    [Product(**data["product"]) for _, data in accepted],
+                    batch_size=BULK_BATCH_SIZE,
+                )
+                shopproducts = ShopProduct.objects.bulk_create(
+                    [
+                        ShopProduct(
+                            shop_id=data["shop"],
+                            product=product,
+                            price=data["price"],
+                            in_stock=data["in_stock"],
+                        )
+                        for (_, data), product in zip(accepted, products)
+                    ],
+                    batch_size=BULK_BATCH_SIZE,
+                )
+
+                # bulk_create does not send the signals that keep the summaries
+                delta = InventoryDelta()
+                for shopproduct in shopproducts:
+                    delta.add(
+                        shopproduct.shop_id, shopproduct.price, shopproduct.in_stock
+                    )
+                delta.apply()
+            break
+        except IntegrityError:
+            # Every retry drops at least one item, anything else is re-raised
+            accepted, conflicts = check_shopproducts(accepted)
+            if not conflicts:
+                raise
+            errors.extend(conflicts)
+
+    # bulk_create does not send the signals that keep the cache in sync
+    invalidate_details("product", [product.pk for product in products])
+
+    created = [
+        {"index": index, "id": shopproduct.pk, "product": shopproduct.product_id}
+        for (index, _), shopproduct in zip(accepted, shopproducts)
+    ]
+    errors.sort(key=lambda error: error["index"])
+
+    return created, errors
+
+
+def lock_shopproducts(keys):
+    """
+    Locks the offers of the given (shop, product) pairs
+
+    The pairs are matched exactly, grouped by shop, so no other offer of
+    the shops or products is locked. Rows are locked in id order, so
+    concurrent batches cannot deadlock on each other.
+    """
+    products = defaultdict(set)
+    for shop_id, product_id in keys:
+        products[shop_id].add(product_id)
+
+    return (
+        ShopProduct.objects.select_for_update()
+        .filter(
+            reduce(
+                or_,
+                (
+                    Q(shop_id=shop_id, product_id__in=product_ids)
+                    for shop_id, product_ids in products.items()
+                ),
+            )
+        )
+        .order_by("id")
+    )
+
+
+def update_shopproducts(items):
+    """
+    Applies price and stock changes keyed by (shop, product)
+
+    Changes are applied in batches: one SELECT ... FOR UPDATE finds and
+    locks the matching offers and one UPDATE writes all of them. When an
+    item sets only one field the other keeps the locked current value.
+
+    Returns a tuple of (updated, unmatched, errors): the ids of the offers
+    changed for each item index, the indexes with no matching offer and
+    the validation errors.
+    """
+    errors = []
+    changes = {}
+
+    for index, item in enumerate(items):
+        serializer = BulkUpdateShopProductSerializer(data=item)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            # The last change of the same offer wins
+            changes[(data["shop"], data["product"])] = (index, data)
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+
+    updated = []
+    unmatched = []
+    product_ids = set()
+
+    for batch in batched(changes.items(), BULK_UPDATE_BATCH_SIZE):
+        batch = dict(batch)
+
+        with transaction.atomic():
+            rows = lock_shopproducts(batch).only(
+                "id", "shop_id", "product_id", "price", "in_stock"
+            )
+
+            matched = {}
+            delta = InventoryDelta()
+            for row in rows:
+                _, data = batch[(row.shop_id, row.product_id)]
+                delta.remove(row.shop_id, row.price, row.in_stock)
+                row.price = data.get("price", row.price)
+                row.in_stock = data.get("in_stock", row.in_stock)
+                delta.add(row.shop_id, row.price, row.in_stock)
+                matched.setdefault((row.shop_id, row.product_id), []).append(row)
+
+            ShopProduct.objects.bulk_update(
+                [row for group in matched.values() for row in group],
+                ["price", "in_stock"],
+            )
+            delta.apply()
+
+        for key, (index, _) in batch.items():
+            if key in matched:
+                updated.append(
+                    {"index": index, "ids": [row.pk for row in matched[key]]}
+                )
+                product_ids.add(key[1])
+            else:
+                unmatched.append(index)
+
+    # bulk_update does not send the signals that keep the cache in sync
+    invalidate_details("product", product_ids)
+
+    updated.sort(key=lambda item: item["index"])
+    unmatched.sort()
+
+    return updated, unmatched, errors
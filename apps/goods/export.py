@@ -0,0 +1,102 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from apps.goods.models import Category, Product
+from core.renderers import NDJSONRenderer
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_CONTENT_TYPES = {"csv": "text/csv", "ndjson": NDJSONRenderer.media_type}
+
+EXPORT_COLUMNS = [
+    "product_id",
+    "title",
+    "desc",
+    "shop_id",
+    "shop_title",
+    "price",
+    "in_stock",
+    "categories",
+]
+# Separator of the category paths inside one CSV cell
+CATEGORIES_SEPARATOR = "; "
+
+
+def _get_category_paths(product_ids):
+    paths = defaultdict(list)
+    assignments = (
+        Category.products.through.objects.filter(product_id__in=product_ids)
+        .order_by("category__full_path")
+        .values_list("product_id", "category__full_path")
+    )
+
+    for product_id, full_path in assignments:
+        paths[product_id].append(full_path)
+    return paths
+
+
+def iter_catalog_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one dict per shop offer of every product, and one with empty
+    offer fields for the products no shop sells
+
+    Rows are read as plain values through ``QuerySet.iterator`` (a
+    server-side cursor on PostgreSQL) and the category paths are looked
+    up once per chunk, so memory does not grow with the catalog.
+    """
+    rows = (
+        Product.objects.order_by("id", "shopproducts__id")
+        .values_list(
+            "id",
+            "title",
+            "desc",
+            "shopproducts__shop_id",
+            "shopproducts__shop__title",
+            "shopproducts__price",
+            "shopproducts__in_stock",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+    while chunk := list(islice(rows, chunk_size)):
+        paths = _get_category_paths({row[0] for row in chunk})
+
+        for row in chunk:
+            item = dict(zip(EXPORT_COLUMNS, row))
+            if item["price"] is not None:
+                # Same representation as the DecimalField of the serializers
+                item["price"] = str(item["price"])
+            item["categories"] = paths.get(item["product_id"], [])
+            yield item
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+
+    for row in rows:
+        row["categories"] = CATEGORIES_SEPARATOR.join(row["categories"])
+        yield writer.writerow(row[column] for column in EXPORT_COLUMNS)
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def iter_catalog_export(export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Returns an iterator of CSV or NDJSON lines of the whole catalog
+    """
+    rows = iter_catalog_rows(chunk_size)
+
+    if export_format == "csv":
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -1,22 +1,40 @@
 import django_filters
 
 from apps.goods.models import ShopProduct, Category
+from core.search import search_by_title
 
 
 class ProductFilter(django_filters.FilterSet):
     title = django_filters.CharFilter(
-        field_name="product__title", lookup_expr="icontains"
+        field_name="product__title", method="filter_title"
     )
     max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
     min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    category = django_filters.NumberFilter(method="filter_category")
+    include_descendants = django_filters.BooleanFilter(
+        method="filter_include_descendants"
+    )
 
     class Meta:
         model = ShopProduct
         fields = ["max_price", "min_price"]
 
+    def filter_title(self, queryset, name, value):
+        return search_by_title(queryset, name, value)
+
+    def filter_category(self, queryset, name, value):
+        product_ids = Category.objects.product_ids(
+            value, self.form.cleaned_data.get("include_descendants")
+        )
+        return queryset.filter(product__in=product_ids)
+
+    def filter_include_descendants(self, queryset, name, value):
+        # Only changes how the category filter resolves categories
+        return queryset
+
 
 class CategoryFilter(django_filters.FilterSet):
-    title = django_filters.CharFilter(lookup_expr="icontains")
+    title = django_filters.CharFilter(method="filter_title")
     parent_title = django_filters.CharFilter(
         field_name="parent__title", lookup_expr="icontains"
     )
@@ -24,3 +42,6 @@ class CategoryFilter(django_filters.FilterSet):
     class Meta:
         model = Category
         fields = ["title"]
+
+    def filter_title(self, queryset, name, value):
+        return search_by_title(queryset, name, value)
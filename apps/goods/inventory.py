@@ -0,0 +1,184 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Now
+
+from apps.goods.models import ShopInventorySummary, ShopProduct
+from apps.shop.models import Shop
+
+SUMMARY_FIELDS = (
+    "offers_count",
+    "units_in_stock",
+    "stock_value",
+    "price_total",
+    "out_of_stock_count",
+)
+
+
+def empty_figures():
+    return {
+        "offers_count": 0,
+        "units_in_stock": 0,
+        "stock_value": Decimal("0.00"),
+        "price_total": Decimal("0.00"),
+        "out_of_stock_count": 0,
+    }
+
+
+class InventoryDelta:
+    """
+    Accumulates the changes of offers per shop and applies them to
+    ShopInventorySummary in two statements, whatever the number of offers
+
+    Usage:
+        delta = InventoryDelta()
+        delta.remove(old.shop_id, old.price, old.in_stock)
+        delta.add(new.shop_id, new.price, new.in_stock)
+        delta.apply()
+    """
+
+    def __init__(self):
+        self.shops = defaultdict(empty_figures)
+
+    def add(self, shop_id, price, in_stock, sign=1):
+        price = Decimal(str(price))
+        in_stock = int(in_stock)
+
+        figures = self.shops[shop_id]
+        figures["offers_count"] += sign
+        figures["units_in_stock"] += sign * in_stock
+        figures["stock_value"] += sign * price * in_stock
+        figures["price_total"] += sign * price
+        figures["out_of_stock_count"] += sign * (in_stock == 0)
+
+    def remove(self, shop_id, price, in_stock):
+        self.add(shop_id, price, in_stock, sign=-1)
+
+    def apply(self):
+        changes = {
+            shop_id: figures
+            for shop_id, figures in self.shops.items()
+            if any(figures.values())
+        }
+        if not changes:
+            return
+
+        # Rows are only created for shops that gain offers: the offers of a
+        # deleted shop are removed after its summary
+        ShopInventorySummary.objects.bulk_create(
+            [
+                ShopInventorySummary(shop_id=shop_id)
+                for shop_id, figures in changes.items()
+                if figures["offers_count"] > 0
+            ],
+            ignore_conflicts=True,
+        )
+
+        ShopInventorySummary.objects.filter(shop_id__in=changes).update(
+            updated_at=Now(),
+            **{
+                name: F(name)
+                + Case(
+                    *(
+                        When(shop_id=shop_id, then=Value(figures[name]))
+                        for shop_id, figures in changes.items()
+                    ),
+                    default=Value(0),
+                    output_field=ShopInventorySummary._meta.get_field(name),
+                )
+                for name in SUMMARY_FIELDS
+            },
+        )
+        self.shops.clear()
+
+
+def lock_summaries(shop_ids=None):
+    """
+    Locks the summary rows of the shops, every shop when shop_ids is None,
+    and returns their stored figures keyed by shop id
+
+    Called in a transaction before the figures are recomputed: a write of
+    offers applies its delta after the rebuilt figures are committed
+    instead of being overwritten by them. Missing rows are created empty
+    first so they are locked too, and left out of the returned figures.
+    """
+    shops = Shop.objects.all()
+    if shop_ids is not None:
+        shops = shops.filter(id__in=shop_ids)
+
+    summaries = ShopInventorySummary.objects.filter(shop__in=shops)
+    existing = set(summaries.values_list("shop_id", flat=True))
+    ShopInventorySummary.objects.bulk_create(
+        [
+            ShopInventorySummary(shop_id=shop_id)
+            for shop_id in shops.values_list("id", flat=True)
+            if shop_id not in existing
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    return {
+        row.pop("shop_id"): row
+        for row in summaries.select_for_update()
+        .order_by("shop_id")
+        .values("shop_id", *SUMMARY_FIELDS)
+        if row["shop_id"] in existing
+    }
+
+
+def compute_summaries(shop_ids=None):
+    """
+    Returns the figures of the shops computed from their offers, keyed by
+    shop id, with one grouped query; every shop when shop_ids is None
+    """
+    shops = Shop.objects.all()
+    if shop_ids is not None:
+        shops = shops.filter(id__in=shop_ids)
+    summaries = {
+        shop_id: empty_figures() for shop_id in shops.values_list("id", flat=True)
+    }
+
+    offers = ShopProduct.objects.filter(shop__in=shops).values("shop_id")
+    for row in offers.annotate(
+        offers_count=Count("id"),
+        units_in_stock=Sum("in_stock"),
+        stock_value=Sum(F("price") * F("in_stock")),
+        price_total=Sum("price"),
+        out_of_stock_count=Count("id", filter=Q(in_stock=0)),
+    ).order_by():
+        summaries[row["shop_id"]].update({name: row[name] for name in SUMMARY_FIELDS})
+
+    for figures in summaries.values():
+        for name in ("stock_value", "price_total"):
+            figures[name] = Decimal(str(figures[name])).quantize(Decimal("0.01"))
+
+    return summaries
+
+
+def write_summaries(summaries):
+    """
+    Overwrites the summary rows of the shops with the given figures
+    """
+    ShopInventorySummary.objects.bulk_create(
+        [
+            ShopInventorySummary(shop_id=shop_id, **figures)
+            for shop_id, figures in summaries.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["shop"],
+        update_fields=[*SUMMARY_FIELDS, "updated_at"],
+    )
+
+
+def rebuild_summaries(shop_ids=None):
+    """
+    Recomputes the summaries of the shops from their offers, used after
+    writes that bypass the ORM such as the catalog import
+    """
+    with transaction.atomic():
+        lock_summaries(shop_ids)
+        write_summaries(compute_summaries(shop_ids))
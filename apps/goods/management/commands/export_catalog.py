@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.goods.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_catalog_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes every product with its shop offers and category paths as CSV "
+        "or NDJSON, reading the catalog chunk by chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument(
+            "--output", help="File to write to, the standard output by default"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Rows fetched from the database at a time",
+        )
+
+    def handle(self, *args, **options):
+        lines = iter_catalog_export(options["format"], options["chunk_size"])
+
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        with open(options["output"], "w", newline="", encoding="utf-8") as file:
+            file.writelines(lines)
+
+        self.stderr.write(
+            self.style.SUCCESS(f"Catalog exported to {options['output']}")
+        )
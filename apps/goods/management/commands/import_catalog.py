@@ -0,0 +1,248 @@
+import csv
+import hashlib
+import json
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from apps.goods.inventory import rebuild_summaries
+from apps.goods.models import Category, Product, ShopProduct
+from apps.shop.models import Shop
+from core.cache import invalidate_all
+from core.commands import guess_format
+
+STATE_TABLE = "import_catalog_state"
+
+# Columns of every kind of file, in the order they are staged
+KINDS = {
+    "products": [("title", "text"), ("desc", "text")],
+    "offers": [
+        ("shop_id", "bigint"),
+        ("product_title", "text"),
+        ("price", "numeric(10, 2)"),
+        ("in_stock", "integer"),
+    ],
+    "categories": [("category_id", "bigint"), ("product_title", "text")],
+}
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def table(model):
+    return quote(model._meta.db_table)
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads a CSV or NDJSON file of products, shop offers or category "
+        "assignments through PostgreSQL COPY into a staging table and merges "
+        "it into the catalog. An interrupted import resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(KINDS))
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Format of the file, guessed from its extension by default",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50000,
+            help="Rows copied and checkpointed per transaction",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Drop the staged rows of a previous run and start over",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("import_catalog requires PostgreSQL")
+
+        kind = options["kind"]
+        path = os.path.realpath(options["path"])
+        if not os.path.isfile(path):
+            raise CommandError(f"{path} does not exist")
+
+        file_format = options["format"] or guess_format(path)
+        columns = KINDS[kind]
+        stage = (
+            "import_catalog_" + hashlib.md5(f"{kind}:{path}".encode()).hexdigest()[:16]
+        )
+
+        self.prepare(stage, kind, path, columns, options["restart"])
+        staged = self.stage(stage, path, file_format, columns, options["chunk_size"])
+
+        with transaction.atomic():
+            result = getattr(self, f"merge_{kind}")(stage)
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {quote(stage)}")
+                cursor.execute(
+                    f"DELETE FROM {STATE_TABLE} WHERE stage_table = %s", [stage]
+                )
+
+        invalidate_all()
+        summary = ", ".join(f"{key}: {value}" for key, value in result.items())
+        self.stdout.write(self.style.SUCCESS(f"Staged {staged} rows, {summary}"))
+
+    def prepare(self, stage, kind, path, columns, restart):
+        definition = ", ".join(f"{quote(name)} {type_}" for name, type_ in columns)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} ("
+                "stage_table text PRIMARY KEY, kind text NOT NULL, "
+                "source text NOT NULL, rows_staged bigint NOT NULL DEFAULT 0)"
+            )
+            if restart:
+                cursor.execute(f"DROP TABLE IF EXISTS {quote(stage)}")
+                cursor.execute(
+                    f"DELETE FROM {STATE_TABLE} WHERE stage_table = %s", [stage]
+                )
+
+            # UNLOGGED: the staged rows can always be read again from the file
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE IF NOT EXISTS {quote(stage)} "
+                f"(line bigint NOT NULL, {definition})"
+            )
+            cursor.execute(
+                f"INSERT INTO {STATE_TABLE} (stage_table, kind, source) "
+                "VALUES (%s, %s, %s) ON CONFLICT (stage_table) DO NOTHING",
+                [stage, kind, path],
+            )
+
+    def read_rows(self, path, file_format, columns):
+        names = [name for name, _ in columns]
+
+        with open(path, newline="", encoding="utf-8") as file:
+            if file_format == "csv":
+                records = csv.DictReader(file)
+            else:
+                records = (json.loads(line) for line in file if line.strip())
+
+            for record in records:
+                yield [record.get(name) for name in names]
+
+    def stage(self, stage, path, file_format, columns, chunk_size):
+        names = ", ".join(["line", *(quote(name) for name, _ in columns)])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rows_staged FROM {STATE_TABLE} WHERE stage_table = %s",
+                [stage],
+            )
+            staged = cursor.fetchone()[0]
+
+        if staged:
+            self.stdout.write(f"Resuming after {staged} staged rows")
+
+        rows = islice(self.read_rows(path, file_format, columns), staged, None)
+
+        while chunk := list(islice(rows, chunk_size)):
+            try:
+                # The copied rows and the checkpoint are committed together
+                with transaction.atomic(), connection.cursor() as cursor:
+                    with cursor.copy(
+                        f"COPY {quote(stage)} ({names}) FROM STDIN"
+                    ) as copy:
+                        for line, row in enumerate(chunk, start=staged + 1):
+                            copy.write_row([line, *row])
+
+                    cursor.execute(
+                        f"UPDATE {STATE_TABLE} SET rows_staged = %s "
+                        "WHERE stage_table = %s",
+                        [staged + len(chunk), stage],
+                    )
+            except DatabaseError as error:
+                raise CommandError(
+                    f"Rows {staged + 1}-{staged + len(chunk)} are invalid: {error}"
+                )
+
+            staged += len(chunk)
+            self.stdout.write(f"Staged {staged} rows")
+
+        return staged
+
+    def merge_products(self, stage):
+        with connection.cursor() as cursor:
+            # The last line of a title wins
+            cursor.execute(
+                f"INSERT INTO {table(Product)} (title, {quote('desc')}) "
+                f"SELECT DISTINCT ON (title) title, COALESCE({quote('desc')}, '') "
+                f"FROM {quote(stage)} WHERE title IS NOT NULL "
+                "ORDER BY title, line DESC "
+                f"ON CONFLICT (title) DO UPDATE SET {quote('desc')} = "
+                f"EXCLUDED.{quote('desc')}"
+            )
+            return {"products written": cursor.rowcount}
+
+    def merge_offers(self, stage):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE import_catalog_offers AS "
+                "SELECT DISTINCT ON (s.shop_id, p.id) "
+                "s.shop_id, p.id AS product_id, s.price, s.in_stock "
+                f"FROM {quote(stage)} s "
+                f"JOIN {table(Product)} p ON p.title = s.product_title "
+                f"JOIN {table(Shop)} sh ON sh.id = s.shop_id "
+                "WHERE s.price IS NOT NULL AND s.in_stock >= 0 "
+                "ORDER BY s.shop_id, p.id, s.line DESC"
+            )
+            cursor.execute("SELECT count(*) FROM import_catalog_offers")
+            matched = cursor.fetchone()[0]
+
+            cursor.execute(
+                f"UPDATE {table(ShopProduct)} sp "
+                "SET price = o.price, in_stock = o.in_stock "
+                "FROM import_catalog_offers o "
+                "WHERE sp.shop_id = o.shop_id AND sp.product_id = o.product_id"
+            )
+            updated = cursor.rowcount
+
+            cursor.execute(
+                f"INSERT INTO {table(ShopProduct)} "
+                "(shop_id, product_id, price, in_stock) "
+                "SELECT o.shop_id, o.product_id, o.price, o.in_stock "
+                "FROM import_catalog_offers o WHERE NOT EXISTS ("
+                f"SELECT 1 FROM {table(ShopProduct)} sp "
+                "WHERE sp.shop_id = o.shop_id AND sp.product_id = o.product_id)"
+            )
+            inserted = cursor.rowcount
+
+            cursor.execute(f"SELECT count(*) FROM {quote(stage)}")
+            skipped = cursor.fetchone()[0] - matched
+
+            cursor.execute("SELECT DISTINCT shop_id FROM import_catalog_offers")
+            shop_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("DROP TABLE import_catalog_offers")
+
+        # The merge bypasses the signals that keep the summaries in sync
+        rebuild_summaries(shop_ids)
+
+        return {
+            "offers updated": updated,
+            "offers created": inserted,
+            "skipped": skipped,
+        }
+
+    def merge_categories(self, stage):
+        through = Category.products.through
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table(through)} (category_id, product_id) "
+                "SELECT DISTINCT s.category_id, p.id "
+                f"FROM {quote(stage)} s "
+                f"JOIN {table(Product)} p ON p.title = s.product_title "
+                f"JOIN {table(Category)} c ON c.id = s.category_id "
+                "ON CONFLICT (category_id, product_id) DO NOTHING"
+            )
+            return {"assignments created": cursor.rowcount}
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.goods.inventory import (
+    SUMMARY_FIELDS,
+    compute_summaries,
+    empty_figures,
+    lock_summaries,
+    write_summaries,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the inventory summaries of the shops from their offers, "
+        "reports the ones that drifted and repairs them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the drift, without writing the summaries",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Offer writes wait for the repair instead of being lost in it
+            stored = lock_summaries()
+            expected = compute_summaries()
+
+            drifted = {}
+            for shop_id, figures in expected.items():
+                current = stored.get(shop_id)
+                if current is None:
+                    self.stdout.write(f"Shop {shop_id}: summary is missing")
+                    current = empty_figures()
+                changes = [
+                    f"{name} {current[name]} -> {figures[name]}"
+                    for name in SUMMARY_FIELDS
+                    if current[name] != figures[name]
+                ]
+                if changes or shop_id not in stored:
+                    drifted[shop_id] = figures
+                if changes:
+                    self.stdout.write(f"Shop {shop_id}: {', '.join(changes)}")
+
+            if options["dry_run"]:
+                # Drops the empty rows created to lock the missing summaries
+                transaction.set_rollback(True)
+            elif drifted:
+                write_summaries(drifted)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Inventory summaries are in sync"))
+        elif options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING(f"{len(drifted)} shop summaries drifted")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"{len(drifted)} shop summaries repaired")
+            )
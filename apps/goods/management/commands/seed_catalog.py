@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.goods.seeding import SEED_BATCH_SIZE, seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic catalog of responsibles, shops, products, "
+        "offers and a category tree for load testing. The rows are written "
+        "in batches, with COPY on PostgreSQL, and the same seed generates "
+        "the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shops", type=int, default=100)
+        parser.add_argument(
+            "--products",
+            type=int,
+            default=10_000,
+            help="Products to create, each with one offer",
+        )
+        parser.add_argument(
+            "--categories-depth",
+            type=int,
+            default=3,
+            help="Levels of the category tree, 0 for no categories",
+        )
+        parser.add_argument(
+            "--categories-width",
+            type=int,
+            default=4,
+            help="Children of every category",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Responsibles to create, as many as shops by default",
+        )
+        parser.add_argument("--responsibles-per-shop", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["shops"] < 1:
+            raise CommandError("At least one shop is needed for the offers")
+        if options["categories_depth"] < 0 or options["categories_width"] < 0:
+            raise CommandError("The category tree cannot have a negative size")
+
+        counts, elapsed = seed_catalog(
+            shops=options["shops"],
+            products=options["products"],
+            categories_depth=options["categories_depth"],
+            categories_width=options["categories_width"],
+            users=options["users"],
+            responsibles_per_shop=options["responsibles_per_shop"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+        )
+
+        rows = sum(counts.values())
+        self.stdout.write(
+            ", ".join(f"{name}: {count}" for name, count in counts.items())
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{rows} rows in {elapsed:.1f}s "
+                f"({rows / max(elapsed, 1e-9) * 60:,.0f} rows per minute)"
+            )
+        )
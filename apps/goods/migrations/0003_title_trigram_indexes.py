@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:29
+
+import core.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0002_category_parent_alter_product_image_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='category',
+            index=core.indexes.TrigramIndex('title', name='category_title_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=core.indexes.TrigramIndex('title', name='product_title_trgm'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:41
+
+from django.db import migrations, models
+
+
+def fill_category_paths(apps, schema_editor):
+    Category = apps.get_model('goods', 'Category')
+
+    categories = {
+        category.pk: category
+        for category in Category.objects.only('id', 'title', 'parent_id')
+    }
+    children = {}
+    for category in categories.values():
+        children.setdefault(category.parent_id, []).append(category)
+
+    # Walk the tree from the roots, parents are always filled before children
+    queue = [(child, None) for child in children.get(None, [])]
+    while queue:
+        category, parent = queue.pop()
+        if parent is None:
+            category.path, category.depth, category.full_path = '', 0, category.title
+        else:
+            category.path = f'{parent.path}{parent.pk}/'
+            category.depth = parent.depth + 1
+            category.full_path = f'{parent.full_path} > {category.title}'
+        queue.extend((child, category) for child in children.get(category.pk, []))
+
+    Category.objects.bulk_update(
+        categories.values(), ['path', 'depth', 'full_path'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0003_title_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='full_path',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_category_paths, migrations.RunPython.noop),
+    ]
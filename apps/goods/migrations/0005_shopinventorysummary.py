@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+
+def fill_inventory_summaries(apps, schema_editor):
+    Shop = apps.get_model('shop', 'Shop')
+    ShopProduct = apps.get_model('goods', 'ShopProduct')
+    ShopInventorySummary = apps.get_model('goods', 'ShopInventorySummary')
+
+    figures = {
+        row.pop('shop_id'): row
+        for row in ShopProduct.objects.values('shop_id').annotate(
+            offers_count=Count('id'),
+            units_in_stock=Sum('in_stock'),
+            stock_value=Sum(F('price') * F('in_stock')),
+            price_total=Sum('price'),
+            out_of_stock_count=Count('id', filter=Q(in_stock=0)),
+        ).order_by()
+    }
+    ShopInventorySummary.objects.bulk_create(
+        [
+            ShopInventorySummary(shop_id=shop_id, **figures.get(shop_id, {}))
+            for shop_id in Shop.objects.values_list('id', flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0004_category_materialized_path'),
+        ('shop', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopInventorySummary',
+            fields=[
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory_summary', serialize=False, to='shop.shop')),
+                ('offers_count', models.IntegerField(default=0)),
+                ('units_in_stock', models.BigIntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('out_of_stock_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_inventory_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:08
+
+import time
+
+from django.db import migrations, models
+
+
+def create_all_versions_marker(apps, schema_editor):
+    # Every marker is at least this one, see core.cache.get_version
+    ResourceVersion = apps.get_model('goods', 'ResourceVersion')
+    ResourceVersion.objects.create(key='all', version=time.time_ns() // 1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0005_shopinventorysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_all_versions_marker, migrations.RunPython.noop),
+    ]
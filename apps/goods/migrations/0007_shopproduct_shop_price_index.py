@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0006_resourceversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopproduct',
+            index=models.Index(fields=['shop', 'price'], name='shopproduct_shop_price'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:40
+
+import core.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0007_shopproduct_shop_price_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='path',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=core.indexes.PatternOpsIndex('path', name='category_path_pattern'),
+        ),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Subquery, Value
+from django.db.models.functions import Concat, Substr
 
 from apps.shop.models import Shop
+from core.indexes import PatternOpsIndex, TrigramIndex
 
 
 class Product(models.Model):
@@ -22,6 +25,11 @@ class Product(models.Model):
     image = models.ImageField(upload_to="products_images/", null=True)
     shops = models.ManyToManyField(Shop, through="ShopProduct", related_name="shops")
 
+    class Meta:
+        indexes = [
+            TrigramIndex("title", name="product_title_trgm"),
+        ]
+
     def __str__(self):
         return f"{self.title}"
 
@@ -46,20 +54,119 @@ class ShopProduct(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     in_stock = models.PositiveIntegerField()
 
+    class Meta:
+        indexes = [
+            # Min and max price of a shop are read from the ends of this index
+            models.Index(fields=["shop", "price"], name="shopproduct_shop_price"),
+        ]
+
+
+class ShopInventorySummary(models.Model):
+    """
+    Denormalized offer totals of a shop
+
+    Kept up to date incrementally by apps.goods.inventory on every write of
+    ShopProduct rows, rebuilt by the reconcile_inventory command.
+
+    Attributes:
+        shop (FK): One to One relation to Shop model, the primary key
+        offers_count (int): the number of offers of the shop
+        units_in_stock (int): the sum of in_stock of the offers
+        stock_value (Decimal): the sum of price * in_stock of the offers
+        price_total (Decimal): the sum of the prices of the offers
+        out_of_stock_count (int): the number of offers with nothing in stock
+        updated_at (datetime): the time of the last change
+
+    Methods:
+        avg_price: the average price of the offers, None without offers
+    """
+
+    shop = models.OneToOneField(
+        Shop,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="inventory_summary",
+    )
+    # Signed on purpose: a drifted row must never make a write of offers fail
+    offers_count = models.IntegerField(default=0)
+    units_in_stock = models.BigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    price_total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    out_of_stock_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.shop_id}"
+
+    @property
+    def avg_price(self):
+        if not self.offers_count:
+            return None
+        return self.price_total / self.offers_count
+
+
+class CategoryQuerySet(models.QuerySet):
+    def subtree(self, category_id):
+        """
+        Returns the category and all of its descendants
+
+        The materialized path of every descendant starts with the path of
+        the category followed by its id. That prefix is read by a subquery
+        on the row of the category, so the subtree stays one lazy statement
+        whatever the depth of the tree.
+        """
+        prefix = self.model.objects.filter(pk=category_id).values(
+            prefix=Concat(
+                "path",
+                "pk",
+                Value(Category.PATH_SEPARATOR),
+                output_field=models.TextField(),
+            )
+        )
+        return self.filter(Q(pk=category_id) | Q(path__startswith=Subquery(prefix)))
+
+    def product_ids(self, category_id, include_descendants=False):
+        """
+        Returns a subquery of the ids of the products in the category, or
+        in its whole subtree
+        """
+        if include_descendants:
+            categories = self.subtree(category_id)
+        else:
+            categories = self.filter(pk=category_id)
+
+        return Category.products.through.objects.filter(category__in=categories).values(
+            "product_id"
+        )
+
 
 class Category(models.Model):
     """
     Category model
 
+    The hierarchy is stored as a materialized path, so ancestors, depth and
+    the full path of a category are read from its own row and a subtree is
+    a single prefix lookup on the indexed path column.
+
     Attributes:
         title (str): The title of the category
         parent (FK): A self-referential foreign key for category hierarchy
         products (FK): Many to Many relation to Product model
+        path (str): ids of the ancestors from the root, e.g. "1/5/"
+        depth (int): the number of ancestors
+        full_path (str): titles of the ancestors and the category joined by " > "
 
     Methods:
         __str__(): Returns the title of the category
+        get_full_path(): Returns the stored full path of the category
+        get_ancestors(): Returns the ancestors of the category, root first
+        get_descendants(): Returns every category below this one
     """
 
+    PATH_SEPARATOR = "/"
+    TITLE_SEPARATOR = " > "
+    HIERARCHY_FIELDS = ("path", "depth", "full_path")
+
     title = models.CharField(max_length=30)
     parent = models.ForeignKey(
         "self",
@@ -69,16 +176,143 @@ class Category(models.Model):
         related_name="subcategories",
     )
     products = models.ManyToManyField(Product, related_name="categories")
+    path = models.TextField(default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    full_path = models.TextField(default="", editable=False)
+
+    objects = CategoryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            TrigramIndex("title", name="category_title_trgm"),
+            # Subtrees are prefix lookups on the path, whatever its length
+            PatternOpsIndex("path", name="category_path_pattern"),
+        ]
 
     def __str__(self):
         return f"{self.title}"
 
+    @property
+    def descendants_path(self):
+        return f"{self.path}{self.pk}{self.PATH_SEPARATOR}"
+
+    @property
+    def ancestor_ids(self):
+        return [int(pk) for pk in self.path.split(self.PATH_SEPARATOR) if pk]
+
     def get_full_path(self):
-        path = []
-        category = self
+        return self.full_path
+
+    def get_ancestors(self):
+        return Category.objects.filter(pk__in=self.ancestor_ids).order_by("depth")
+
+    def get_descendants(self):
+        return Category.objects.filter(path__startswith=self.descendants_path)
+
+    def set_hierarchy(self):
+        parent = self.parent
+
+        if parent is None:
+            self.path = ""
+            self.depth = 0
+            self.full_path = self.title
+            return
+
+        if self.pk is not None and self.pk in (parent.pk, *parent.ancestor_ids):
+            raise ValueError("A category cannot be moved under itself!")
+
+        self.path = parent.descendants_path
+        self.depth = parent.depth + 1
+        self.full_path = f"{parent.full_path}{self.TITLE_SEPARATOR}{self.title}"
+
+    def save(self, *args, **kwargs):
+        # The row and its subtree are rewritten together or not at all, and
+        # concurrent saves of the category wait for each other
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = (
+                    Category.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values("path", "depth", "full_path")
+                    .first()
+                )
+
+            self.set_hierarchy()
+            update_fields = kwargs.get("update_fields")
+            if update_fields:
+                # The hierarchy follows the title and the parent, it is written
+                # with them before the descendants are rebased on it
+                kwargs["update_fields"] = {*update_fields, *self.HIERARCHY_FIELDS}
+            super().save(*args, **kwargs)
+
+            if previous and (
+                previous["path"] != self.path or previous["full_path"] != self.full_path
+            ):
+                self.rebase_descendants(
+                    old_path=f"{previous['path']}{self.pk}{self.PATH_SEPARATOR}",
+                    old_full_path=previous["full_path"] + self.TITLE_SEPARATOR,
+                    new_path=self.descendants_path,
+                    new_full_path=self.full_path + self.TITLE_SEPARATOR,
+                    depth_delta=self.depth - previous["depth"],
+                )
 
-        while category:
-            path.append(category.title)
-            category = category.parent
+    def detach_descendants(self):
+        """
+        Turns the children of the category into roots of their own subtrees,
+        called right before the category is deleted
+        """
+        current = (
+            Category.objects.filter(pk=self.pk)
+            .values("path", "depth", "full_path")
+            .first()
+        )
+        if current is None:
+            return
 
-        return " > ".join(reversed(path))
+        self.rebase_descendants(
+            old_path=f"{current['path']}{self.pk}{self.PATH_SEPARATOR}",
+            old_full_path=current["full_path"] + self.TITLE_SEPARATOR,
+            new_path="",
+            new_full_path="",
+            depth_delta=-(current["depth"] + 1),
+        )
+
+    @classmethod
+    def rebase_descendants(
+        cls, old_path, old_full_path, new_path, new_full_path, depth_delta
+    ):
+        # One UPDATE for the whole subtree, whatever its size or depth
+        return cls.objects.filter(path__startswith=old_path).update(
+            path=Concat(
+                Value(new_path),
+                Substr("path", len(old_path) + 1),
+                output_field=models.TextField(),
+            ),
+            full_path=Concat(
+                Value(new_full_path),
+                Substr("full_path", len(old_full_path) + 1),
+                output_field=models.TextField(),
+            ),
+            depth=F("depth") + depth_delta,
+        )
+
+
+class ResourceVersion(models.Model):
+    """
+    Version marker of a cached object or list, maintained by core.cache
+
+    Read by primary key on every conditional GET and cached detail, so all
+    worker processes and management commands agree on the versions.
+
+    Attributes:
+        key (str): "<kind>:<id>" of an object, "<kind>:list" of a list or
+            "all" for the marker moved by invalidate_all()
+        version (int): the time of the last change in microseconds
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.key}"
@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from django.utils.functional import cached_property
+
+from apps.goods.models import Category, Product
+from apps.shop.projections import get_responsibles, image_url, render_shop
+
+SHOPPRODUCT_COLUMNS = (
+    "id",
+    "price",
+    "in_stock",
+    "product_id",
+    "product__title",
+    "product__desc",
+    "product__image",
+    "shop_id",
+    "shop__title",
+    "shop__desc",
+    "shop__is_active",
+    "shop__image",
+)
+CATEGORY_FIELDS = ("id", "title", "depth", "full_path", "parent")
+
+product_image_storage = Product._meta.get_field("image").storage
+
+
+class ShopProductProjection:
+    """
+    Read-only stand-in for ``ShopProductSerializer(rows, many=True)`` on
+    list pages
+
+    The product and the shop come from the joined columns of
+    ``ShopProductProjection.values(queryset)`` and the responsibles of all
+    the shops of the page from one more query, so a page costs two queries
+    and no model or serializer field instances.
+    """
+
+    def __init__(self, rows, many=True):
+        self.rows = rows
+
+    @staticmethod
+    def values(queryset):
+        return queryset.values(*SHOPPRODUCT_COLUMNS)
+
+    @cached_property
+    def data(self):
+        responsibles = get_responsibles({row["shop_id"] for row in self.rows})
+
+        return [
+            {
+                "id": row["id"],
+                "product": {
+                    "id": row["product_id"],
+                    "title": row["product__title"],
+                    "desc": row["product__desc"],
+                    "image": image_url(product_image_storage, row["product__image"]),
+                },
+                "shop": render_shop(
+                    {
+                        "id": row["shop_id"],
+                        "title": row["shop__title"],
+                        "desc": row["shop__desc"],
+                        "is_active": row["shop__is_active"],
+                        "image": row["shop__image"],
+                    },
+                    responsibles,
+                ),
+                # DecimalField renders the two decimal places as a string
+                "price": f"{row['price']:f}",
+                "in_stock": row["in_stock"],
+            }
+            for row in self.rows
+        ]
+
+
+class CategoryProjection:
+    """
+    Read-only stand-in for ``CategorySerializer(rows, many=True)`` on list
+    pages, the product ids of the page are read from the through table
+    """
+
+    def __init__(self, rows, many=True):
+        self.rows = rows
+
+    @staticmethod
+    def values(queryset):
+        return queryset.values(*CATEGORY_FIELDS)
+
+    @cached_property
+    def data(self):
+        products = defaultdict(list)
+        assignments = (
+            Category.products.through.objects.filter(
+                category_id__in={row["id"] for row in self.rows}
+            )
+            .order_by("category_id", "product_id")
+            .values_list("category_id", "product_id")
+        )
+        for category_id, product_id in assignments:
+            products[category_id].append(product_id)
+
+        return [
+            {
+                "id": row["id"],
+                "title": row["title"],
+                "depth": row["depth"],
+                "full_path": row["full_path"],
+                "parent": row["parent"],
+                "products": products.get(row["id"], []),
+            }
+            for row in self.rows
+        ]
@@ -1,5 +1,10 @@
 from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
 
+from apps.goods.export import EXPORT_FORMATS
+from core.pagination import CURSOR_PARAM_EXAMPLE
+from core.serializers import SPARSE_FIELDSET_PARAM_EXAMPLE
+from core.streaming import STREAM_PARAM_EXAMPLE
+
 PRODUCT_PARAM_EXAMPLE = [
     OpenApiParameter(
         name="title",
@@ -19,7 +24,19 @@ PRODUCT_PARAM_EXAMPLE = [
         required=False,
         type=OpenApiTypes.INT,
     ),
-]
+    OpenApiParameter(
+        name="category",
+        description="Get products of the category with this id",
+        required=False,
+        type=OpenApiTypes.INT,
+    ),
+    OpenApiParameter(
+        name="include_descendants",
+        description="Also get products of every subcategory of the category",
+        required=False,
+        type=OpenApiTypes.BOOL,
+    ),
+] + (CURSOR_PARAM_EXAMPLE + STREAM_PARAM_EXAMPLE + SPARSE_FIELDSET_PARAM_EXAMPLE)
 
 
 CATEGORY_PARAM_EXAMPLE = [
@@ -34,4 +51,15 @@ CATEGORY_PARAM_EXAMPLE = [
         description="Get a category by parent category title",
         type=OpenApiTypes.STR,
     ),
+] + CURSOR_PARAM_EXAMPLE
+
+
+EXPORT_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="export_format",
+        description="Format of the export: csv (default) or ndjson",
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=EXPORT_FORMATS,
+    ),
 ]
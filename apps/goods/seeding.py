@@ -0,0 +1,266 @@
+import random
+import time
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from apps.accounts.models import User
+from apps.goods.inventory import rebuild_summaries
+from apps.goods.models import Category, Product, ShopProduct
+from apps.shop.models import Shop
+from core.cache import invalidate_all
+
+SEED_BATCH_SIZE = 10_000
+
+ADJECTIVES = (
+    "Smart",
+    "Wireless",
+    "Compact",
+    "Portable",
+    "Classic",
+    "Premium",
+    "Ergonomic",
+    "Digital",
+    "Durable",
+    "Silent",
+)
+NOUNS = (
+    "Phone",
+    "Headphones",
+    "Kettle",
+    "Backpack",
+    "Lamp",
+    "Keyboard",
+    "Camera",
+    "Blender",
+    "Watch",
+    "Speaker",
+)
+FIRST_NAMES = ("Анна", "Иван", "Мария", "Пётр", "Елена", "Алексей", "Ольга", "Дмитрий")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров")
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+class RowWriter:
+    """
+    Writes generated rows of a model in batches, with COPY on PostgreSQL
+    and bulk_create elsewhere
+
+    Rows are tuples in the order of ``fields`` (attribute names), the ids
+    are given by the caller, so related rows can be generated without
+    reading anything back.
+    """
+
+    def __init__(self, batch_size=SEED_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def write(self, model, fields, rows):
+        if connection.vendor == "postgresql":
+            return self.copy(model, fields, rows)
+
+        count = 0
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            model.objects.bulk_create(
+                [model(**dict(zip(fields, row))) for row in batch]
+            )
+            count += len(batch)
+        return count
+
+    def copy(self, model, fields, rows):
+        # The defaults of the model are not database defaults, COPY gets
+        # them as values of the fields that are not given
+        defaults = [
+            field
+            for field in model._meta.concrete_fields
+            if field.attname not in fields and not field.primary_key
+        ]
+        default_values = tuple(
+            field.get_db_prep_save(field.get_default(), connection)
+            for field in defaults
+        )
+
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            [quote(model._meta.get_field(name).column) for name in fields]
+            + [quote(field.column) for field in defaults]
+        )
+
+        count = 0
+        with connection.cursor() as cursor:
+            with cursor.copy(
+                f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    copy.write_row(row + default_values)
+                    count += 1
+        return count
+
+
+def build_category_tree(first_id, depth, width):
+    """
+    Returns the rows of a tree of categories ``depth`` levels deep where
+    every category has ``width`` children, and the ids of the leaves
+
+    The hierarchy columns are computed here, like Category.set_hierarchy
+    does on save, since the rows do not go through the model.
+    """
+    rows = []
+    level = [(None, "", -1, "")]
+    next_pk = first_id
+
+    for level_depth in range(depth):
+        children = []
+        for parent_id, parent_path, _, parent_full_path in level:
+            for _ in range(width):
+                title = f"Category {next_pk}"
+                if parent_id is None:
+                    path, full_path = "", title
+                else:
+                    path = f"{parent_path}{parent_id}{Category.PATH_SEPARATOR}"
+                    full_path = f"{parent_full_path}{Category.TITLE_SEPARATOR}{title}"
+
+                rows.append((next_pk, title, parent_id, path, level_depth, full_path))
+                children.append((next_pk, path, level_depth, full_path))
+                next_pk += 1
+        level = children
+
+    # Without levels there are no leaves, only the placeholder of the roots
+    if not rows:
+        return rows, []
+    return rows, [pk for pk, *_ in level]
+
+
+def seed_catalog(
+    shops,
+    products,
+    categories_depth=3,
+    categories_width=4,
+    users=None,
+    responsibles_per_shop=3,
+    seed=0,
+    batch_size=SEED_BATCH_SIZE,
+):
+    """
+    Adds a synthetic catalog to the database and returns the number of
+    rows written per table and the time it took
+
+    The same seed generates the same data. Every product gets one offer in
+    one of the new shops and one leaf category. The rows are streamed in
+    batches, so memory does not grow with the number of products.
+    """
+    rng = random.Random(seed)
+    writer = RowWriter(batch_size)
+    users = max(users or shops, responsibles_per_shop)
+    started = time.perf_counter()
+    counts = {}
+
+    with transaction.atomic():
+        first_user = next_id(User)
+        first_shop = next_id(Shop)
+        first_product = next_id(Product)
+        user_ids = range(first_user, first_user + users)
+        shop_ids = range(first_shop, first_shop + shops)
+
+        # One hash for everyone, hashing per user would take longer than the rest
+        password = make_password(None)
+        counts["users"] = writer.write(
+            User,
+            ("id", "password", "first_name", "last_name", "email", "role", "avatar"),
+            (
+                (
+                    pk,
+                    password,
+                    rng.choice(FIRST_NAMES),
+                    rng.choice(LAST_NAMES),
+                    f"responsible{pk}@example.com",
+                    "RESP",
+                    "avatars/default.jpg",
+                )
+                for pk in user_ids
+            ),
+        )
+        counts["shops"] = writer.write(
+            Shop,
+            ("id", "title", "desc", "is_active"),
+            (
+                (
+                    pk,
+                    f"Shop {pk}",
+                    f"{rng.choice(ADJECTIVES)} goods",
+                    rng.random() > 0.1,
+                )
+                for pk in shop_ids
+            ),
+        )
+        counts["responsibles"] = writer.write(
+            Shop.responsible_id.through,
+            ("shop_id", "user_id"),
+            (
+                (shop_id, user_id)
+                for shop_id in shop_ids
+                for user_id in rng.sample(user_ids, responsibles_per_shop)
+            ),
+        )
+
+        categories, leaves = build_category_tree(
+            next_id(Category), categories_depth, categories_width
+        )
+        counts["categories"] = writer.write(
+            Category,
+            ("id", "title", "parent_id", "path", "depth", "full_path"),
+            categories,
+        )
+
+        product_ids = range(first_product, first_product + products)
+        counts["products"] = writer.write(
+            Product,
+            ("id", "title", "desc"),
+            (
+                (
+                    pk,
+                    f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {pk}",
+                    f"Synthetic product number {pk}",
+                )
+                for pk in product_ids
+            ),
+        )
+        counts["offers"] = writer.write(
+            ShopProduct,
+            ("shop_id", "product_id", "price", "in_stock"),
+            (
+                (
+                    rng.choice(shop_ids),
+                    pk,
+                    Decimal(rng.randrange(100, 10_000_000)) / 100,
+                    0 if rng.random() < 0.1 else rng.randrange(1, 500),
+                )
+                for pk in product_ids
+            ),
+        )
+        if leaves:
+            counts["category assignments"] = writer.write(
+                Category.products.through,
+                ("category_id", "product_id"),
+                ((rng.choice(leaves), pk) for pk in product_ids),
+            )
+
+        # The ids were given explicitly, the sequences are moved past them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Shop, Category, Product]
+            ):
+                cursor.execute(sql)
+
+        rebuild_summaries(shop_ids)
+
+    # Nothing above sends the signals that keep the cache in sync
+    invalidate_all()
+    return counts, time.perf_counter() - started
@@ -3,15 +3,16 @@ from rest_framework import serializers
 from apps.goods.models import ShopProduct, Product, Category
 from apps.shop.models import Shop
 from apps.shop.serializers import ShopSerializer
+from core.serializers import SparseFieldsetMixin
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         exclude = ["shops"]
 
 
-class ShopProductSerializer(serializers.ModelSerializer):
+class ShopProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer()
     shop = ShopSerializer()
 
@@ -63,12 +64,45 @@ class CreateShopProductSerializer(serializers.ModelSerializer):
         return shopproduct
 
 
-class CategorySerializer(serializers.ModelSerializer):
-    full_path = serializers.SerializerMethodField()
+class BulkProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ["title", "desc"]
+        # Titles are checked against the database once for the whole batch
+        extra_kwargs = {"title": {"validators": []}}
+
+
+class BulkCreateShopProductSerializer(serializers.ModelSerializer):
+    """
+    Validates one item of a bulk creation without touching the database,
+    the shop ids and the titles are checked for the whole batch at once
+    """
+
+    product = BulkProductSerializer()
+    shop = serializers.IntegerField()
 
     class Meta:
-        model = Category
-        fields = "__all__"
+        model = ShopProduct
+        fields = ["product", "shop", "price", "in_stock"]
 
-    def get_full_path(self, obj):
-        return obj.get_full_path()
+
+class BulkUpdateShopProductSerializer(serializers.Serializer):
+    """
+    One price/stock change of a bulk update, keyed by (shop, product)
+    """
+
+    shop = serializers.IntegerField()
+    product = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    in_stock = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if "price" not in attrs and "in_stock" not in attrs:
+            raise serializers.ValidationError("Provide price or in_stock!")
+        return attrs
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        exclude = ["path"]
@@ -0,0 +1,156 @@
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from apps.accounts.models import User
+from apps.goods.inventory import InventoryDelta
+from apps.goods.models import Category, Product, ShopProduct
+from apps.shop.models import Shop
+from apps.shop.signals import M2M_EVICT_ACTIONS, RESPONSIBLE_FIELDS
+from core.cache import invalidate_details, invalidate_lists
+
+
+@receiver(pre_delete, sender=Category)
+def detach_subcategories(sender, instance, **kwargs):
+    # Runs before the SET_NULL on the children, which skips Category.save()
+    invalidate_details(
+        "category", instance.get_descendants().values_list("id", flat=True)
+    )
+    instance.detach_descendants()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def evict_category(sender, instance, created=False, **kwargs):
+    # A rename or a move rewrites the full path of the whole subtree
+    subtree = instance.get_descendants().values_list("id", flat=True)
+    invalidate_details("category", {instance.pk, *subtree})
+    if not created:
+        # A move or a delete changes the subtrees that ?category= filters on
+        invalidate_lists("product")
+
+
+@receiver(m2m_changed, sender=Category.products.through)
+def evict_category_products(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in M2M_EVICT_ACTIONS:
+        return
+
+    # The products list filtered by the category changes with its products
+    invalidate_lists("product")
+    if not reverse:
+        invalidate_details("category", [instance.pk])
+    elif action == "pre_clear":
+        invalidate_details("category", instance.categories.values_list("id", flat=True))
+    elif pk_set:
+        invalidate_details("category", pk_set)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def evict_product(sender, instance, **kwargs):
+    invalidate_details("product", [instance.pk])
+
+
+@receiver(pre_delete, sender=Product)
+def evict_product_categories(sender, instance, **kwargs):
+    # The category/product rows are removed without an m2m_changed signal
+    invalidate_details("category", instance.categories.values_list("id", flat=True))
+
+
+def deleted_with_shop(origin):
+    # origin is the instance or the queryset that .delete() was called on
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is Shop
+
+
+@receiver(post_save, sender=ShopProduct)
+@receiver(post_delete, sender=ShopProduct)
+def evict_shopproduct(sender, instance, origin=None, **kwargs):
+    if not deleted_with_shop(origin):
+        invalidate_details("product", [instance.product_id])
+
+
+# Fields of an offer that the inventory summary of its shop depends on
+INVENTORY_FIELDS = {"shop", "shop_id", "price", "in_stock"}
+
+
+def changes_inventory(raw, update_fields):
+    return not raw and not (update_fields and not INVENTORY_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=ShopProduct)
+def remember_offer(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The summary is moved by the difference with the stored values
+    instance._inventory_previous = None
+    if changes_inventory(raw, update_fields) and not instance._state.adding:
+        instance._inventory_previous = (
+            ShopProduct.objects.filter(pk=instance.pk)
+            .values_list("shop_id", "price", "in_stock")
+            .first()
+        )
+
+
+@receiver(post_save, sender=ShopProduct)
+def update_inventory(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not changes_inventory(raw, update_fields):
+        return
+
+    delta = InventoryDelta()
+    previous = getattr(instance, "_inventory_previous", None)
+    if previous is not None:
+        delta.remove(*previous)
+    delta.add(instance.shop_id, instance.price, instance.in_stock)
+    delta.apply()
+
+
+@receiver(post_delete, sender=ShopProduct)
+def remove_from_inventory(sender, instance, origin=None, **kwargs):
+    # The summary of a deleted shop is deleted with it by the cascade
+    if deleted_with_shop(origin):
+        return
+
+    delta = InventoryDelta()
+    delta.remove(instance.shop_id, instance.price, instance.in_stock)
+    delta.apply()
+
+
+@receiver(pre_delete, sender=Shop)
+def evict_deleted_shop_products(sender, instance, **kwargs):
+    # The offers deleted by the cascade skip their own receivers, their
+    # products are invalidated here at once
+    invalidate_details(
+        "product",
+        ShopProduct.objects.filter(shop=instance).values_list("product_id", flat=True),
+    )
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def evict_shop_products(sender, instance, **kwargs):
+    # The offers embed the shop: a product reads the marker of its shop with
+    # its own (core.cache.VERSION_DEPENDENCIES), only the list is moved here
+    invalidate_lists("product")
+
+
+@receiver(m2m_changed, sender=Shop.responsible_id.through)
+def evict_responsible_products(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in M2M_EVICT_ACTIONS:
+        invalidate_lists("product")
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def evict_user_products(sender, instance, update_fields=None, **kwargs):
+    if kwargs.get("created") or (
+        update_fields and not RESPONSIBLE_FIELDS & set(update_fields)
+    ):
+        return
+
+    if Shop.objects.filter(responsible_id=instance).exists():
+        invalidate_lists("product")
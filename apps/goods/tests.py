@@ -1,12 +1,55 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from django.urls import reverse
 
-from apps.goods.models import Product, ShopProduct, Category
-from apps.goods.serializers import ProductSerializer, CategorySerializer
+from apps.goods.bulk import (
+    check_shopproducts,
+    create_shopproducts,
+    lock_shopproducts,
+    update_shopproducts,
+)
+from apps.goods.filters import ProductFilter
+from apps.goods.models import (
+    Product,
+    ShopProduct,
+    Category,
+    ShopInventorySummary,
+    ResourceVersion,
+)
+from apps.goods.projections import CategoryProjection, ShopProductProjection
+from apps.goods.serializers import (
+    ProductSerializer,
+    CategorySerializer,
+    ShopProductSerializer,
+)
 from apps.shop.models import Shop
 from apps.accounts.models import User
+from core import metrics
+from core.cache import invalidate_all, invalidate_details
+from core.middleware import QueryInstrumentationMiddleware
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
 
 
 # Models
@@ -32,6 +75,103 @@ class CategoryModelTest(TestCase):
         path = self.child.get_full_path()
         self.assertEqual(path, "Electronics > Phones")
 
+    def test_category_ancestors_in_one_query(self):
+        grandchild = Category.objects.create(title="Android", parent=self.child)
+        grandchild = Category.objects.get(pk=grandchild.pk)
+
+        with self.assertNumQueries(1):
+            ancestors = [category.title for category in grandchild.get_ancestors()]
+        self.assertEqual(ancestors, ["Electronics", "Phones"])
+        self.assertEqual(grandchild.depth, 2)
+
+    def test_category_move_subtree(self):
+        grandchild = Category.objects.create(title="Android", parent=self.child)
+        other = Category.objects.create(title="Gadgets")
+
+        self.child.parent = other
+        self.child.save()
+
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.get_full_path(), "Gadgets > Phones > Android")
+        self.assertEqual(grandchild.depth, 2)
+        self.assertEqual(list(other.get_descendants()), [self.child, grandchild])
+        self.assertFalse(self.parent.get_descendants().exists())
+
+    def test_category_rename_updates_subtree(self):
+        grandchild = Category.objects.create(title="Android", parent=self.child)
+
+        self.parent.title = "Tech"
+        self.parent.save()
+
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.get_full_path(), "Tech > Phones > Android")
+
+    def test_category_save_with_update_fields_writes_hierarchy(self):
+        other = Category.objects.create(title="Gadgets")
+
+        self.child.title = "Smartphones"
+        self.child.parent = other
+        self.child.save(update_fields=["title", "parent"])
+        self.parent.title = "Tech"
+        self.parent.save(update_fields=["title"])
+
+        self.child.refresh_from_db()
+        self.parent.refresh_from_db()
+        self.assertEqual(self.parent.get_full_path(), "Tech")
+        self.assertEqual(self.child.get_full_path(), "Gadgets > Smartphones")
+        self.assertEqual(self.child.path, other.descendants_path)
+
+    def test_category_move_is_atomic(self):
+        grandchild = Category.objects.create(title="Android", parent=self.child)
+        other = Category.objects.create(title="Gadgets")
+
+        self.child.parent = other
+        with mock.patch.object(
+            Category, "rebase_descendants", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.child.save()
+
+        self.child.refresh_from_db()
+        grandchild.refresh_from_db()
+        self.assertEqual(self.child.get_full_path(), "Electronics > Phones")
+        self.assertEqual(grandchild.path, self.child.descendants_path)
+
+    def test_category_path_is_not_length_limited(self):
+        parent = None
+        for i in range(40):
+            parent = Category.objects.create(
+                pk=10_000_000 + i, title=f"Level {i}", parent=parent
+            )
+
+        self.assertGreater(len(parent.path), 255)
+        self.assertEqual(Category.objects.subtree(10_000_000).count(), 40)
+
+    def test_category_subtree_is_one_query(self):
+        grandchild = Category.objects.create(title="Android", parent=self.child)
+        Category.objects.create(title="Laptops", parent=self.parent)
+
+        with self.assertNumQueries(1):
+            subtree = set(Category.objects.subtree(self.child.pk))
+        self.assertEqual(subtree, {self.child, grandchild})
+        self.assertFalse(Category.objects.subtree(0).exists())
+
+    def test_category_cannot_move_under_descendant(self):
+        self.parent.parent = self.child
+        with self.assertRaises(ValueError):
+            self.parent.save()
+
+    def test_category_delete_detaches_children(self):
+        grandchild = Category.objects.create(title="Android", parent=self.child)
+
+        self.parent.delete()
+
+        self.child.refresh_from_db()
+        grandchild.refresh_from_db()
+        self.assertIsNone(self.child.parent)
+        self.assertEqual(self.child.depth, 0)
+        self.assertEqual(grandchild.get_full_path(), "Phones > Android")
+        self.assertEqual(grandchild.ancestor_ids, [self.child.pk])
+
 
 # Serializers
 class ProductSerializerTest(TestCase):
@@ -49,6 +189,115 @@ class CategorySerializerTest(TestCase):
         self.assertEqual(serializer.data["full_path"], "Books > Fiction")
 
 
+class ProjectionTest(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_responsible(
+                first_name=f"Name {i}",
+                last_name="Ivanov",
+                email=f"projection{i}@example.com",
+                password="pass1234",
+            )
+            for i in range(2)
+        ]
+        shop = Shop.objects.create(title="Shop", desc="Desc", image="shops/a.png")
+        shop.responsible_id.set(self.users)
+        bare_shop = Shop.objects.create(title="Bare", desc="", is_active=False)
+
+        phone = Product.objects.create(title="Phone", desc="Ёмкий", image="p/1.png")
+        cable = Product.objects.create(title="Cable", desc="USB")
+        ShopProduct.objects.create(shop=shop, product=phone, price=10.5, in_stock=3)
+        ShopProduct.objects.create(shop=bare_shop, product=cable, price=5, in_stock=0)
+
+        parent = Category.objects.create(title="Gadgets")
+        parent.products.set([cable, phone])
+        Category.objects.create(title="Phones", parent=parent)
+
+    def assertRendersLike(self, projection, serializer):
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(projection.data), renderer.render(serializer.data)
+        )
+
+    def test_shopproduct_projection_matches_serializer(self):
+        rows = ShopProductProjection.values(ShopProduct.objects.order_by("id"))
+        shopproducts = ShopProduct.objects.order_by("id").prefetch_related(
+            Prefetch("shop__responsible_id", queryset=User.objects.order_by("id"))
+        )
+
+        self.assertRendersLike(
+            ShopProductProjection(list(rows), many=True),
+            ShopProductSerializer(shopproducts, many=True),
+        )
+
+    def test_category_projection_matches_serializer(self):
+        rows = CategoryProjection.values(Category.objects.order_by("id"))
+        categories = Category.objects.order_by("id").prefetch_related(
+            Prefetch("products", queryset=Product.objects.order_by("id"))
+        )
+
+        self.assertRendersLike(
+            CategoryProjection(list(rows), many=True),
+            CategorySerializer(categories, many=True),
+        )
+
+
+# Renderers and parsers
+class ORJSONRendererTest(TestCase):
+    def setUp(self):
+        shop = Shop.objects.create(title="Магазин", desc="Line\u2028break")
+        product = Product.objects.create(title="Phone", desc="Ёмкий", image="p/1.png")
+        shopproduct = ShopProduct.objects.create(
+            shop=shop, product=product, price=Decimal("10.50"), in_stock=3
+        )
+        self.data = {
+            "results": ShopProductSerializer([shopproduct], many=True).data,
+            "raw_price": Decimal("10.50"),
+            "created": datetime(2025, 4, 6, 22, 23, 5, 123456, tzinfo=dt_timezone.utc),
+            "day": date(2025, 4, 6),
+            "message": gettext_lazy("This field is required."),
+            1: None,
+        }
+
+    def test_renders_same_bytes_as_drf(self):
+        self.assertEqual(
+            ORJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+        )
+
+    def test_renders_filterset_errors_like_drf(self):
+        errors = ProductFilter({"category": "abc", "max_price": "x"}).errors
+
+        self.assertEqual(ORJSONRenderer().render(errors), JSONRenderer().render(errors))
+        self.assertIn(b"Enter a number.", ORJSONRenderer().render(errors))
+
+    def test_indented_and_fallback_output_match_drf(self):
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            ORJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type),
+        )
+
+        with mock.patch("core.renderers.orjson", None):
+            self.assertEqual(
+                ORJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+            )
+
+    def test_parser_reads_json_and_reports_errors(self):
+        parser = ORJSONParser()
+        self.assertEqual(
+            parser.parse(BytesIO('{"title": "Ёж", "price": 1.5}'.encode())),
+            {"title": "Ёж", "price": 1.5},
+        )
+
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b"{bad"))
+
+        with mock.patch("core.renderers.orjson", None), mock.patch(
+            "core.parsers.orjson", None
+        ):
+            self.assertEqual(parser.parse(BytesIO(b"[1, 2]")), [1, 2])
+
+
 # Views
 class GoodsAPITest(APITestCase):
     def setUp(self):
@@ -75,6 +324,102 @@ class GoodsAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("API Product", str(response.data))
 
+    def test_get_products_list_cursor_pagination(self):
+        for i in range(3):
+            product = Product.objects.create(title=f"Paged {i}", desc="Desc")
+            ShopProduct.objects.create(
+                shop=self.shop, product=product, price=10, in_stock=1
+            )
+
+        url = reverse("products")
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["previous"])
+
+        # rows inserted after the first page must not shift the next one
+        late = Product.objects.create(title="Late", desc="Desc")
+        ShopProduct.objects.create(shop=self.shop, product=late, price=1, in_stock=1)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [item["product"]["title"] for item in response.data["results"]]
+        self.assertEqual(titles, ["Paged 1", "Paged 2"])
+        self.assertIsNotNone(response.data["previous"])
+
+    def test_search_products_by_title(self):
+        for title in ("Phone case", "Smartphone", "Laptop"):
+            product = Product.objects.create(title=title, desc="Desc")
+            ShopProduct.objects.create(
+                shop=self.shop, product=product, price=10, in_stock=1
+            )
+
+        url = reverse("products")
+        response = self.client.get(url, {"title": "PHONE", "page_size": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [item["product"]["title"] for item in response.data["results"]]
+
+        response = self.client.get(response.data["next"])
+        titles += [item["product"]["title"] for item in response.data["results"]]
+        self.assertIsNone(response.data["next"])
+        self.assertCountEqual(titles, ["Phone case", "Smartphone"])
+
+    def test_search_pages_with_tied_ranks(self):
+        # Every title matches equally well, a cursor on the rank alone would
+        # skip or repeat rows between pages
+        expected = [f"Phone {number}" for number in range(7)]
+        for title in expected:
+            product = Product.objects.create(title=title, desc="Desc")
+            ShopProduct.objects.create(
+                shop=self.shop, product=product, price=10, in_stock=1
+            )
+
+        response = self.client.get(
+            reverse("products"), {"title": "phone", "page_size": 2}
+        )
+        pages = [response.data]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages.append(response.data)
+
+        titles = [
+            item["product"]["title"] for page in pages for item in page["results"]
+        ]
+        self.assertEqual(titles, expected)
+        self.assertEqual(len(pages), 4)
+
+        response = self.client.get(pages[-1]["previous"])
+        self.assertEqual(response.data["results"], pages[-2]["results"])
+
+    def test_filter_products_by_category_subtree(self):
+        phones = Category.objects.create(title="Phones", parent=self.category)
+        android = Category.objects.create(title="Android", parent=phones)
+        android.products.add(self.product)
+        # ids that are a prefix of another id must not match
+        Category.objects.create(title="Other").products.add(self.product)
+
+        url = reverse("products")
+        response = self.client.get(url, {"category": phones.id})
+        self.assertEqual(response.data["results"], [])
+
+        response = self.client.get(
+            url, {"category": self.category.id, "include_descendants": "true"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["product"]["id"], self.product.id)
+
+    def test_stream_products_as_json_array(self):
+        url = reverse("products")
+        response = self.client.get(url, {"stream": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["product"]["title"], "API Product")
+        self.assertEqual(data[0]["price"], "199.99")
+
     def test_create_product(self):
         url = reverse("products")
         payload = {
@@ -87,12 +432,287 @@ class GoodsAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["product"]["title"], "New API Product")
 
+    def test_bulk_create_products(self):
+        url = reverse("products-bulk")
+        payload = [
+            {
+                "product": {"title": "Bulk 1", "desc": "Desc"},
+                "shop": self.shop.id,
+                "price": "10.50",
+                "in_stock": 1,
+            },
+            {
+                "product": {"title": "API Product", "desc": "Taken title"},
+                "shop": self.shop.id,
+                "price": "1.00",
+                "in_stock": 1,
+            },
+            {
+                "product": {"title": "Bulk 2", "desc": "Desc"},
+                "shop": 0,
+                "price": "1.00",
+                "in_stock": 1,
+            },
+            {
+                "product": {"title": "Bulk 1", "desc": "Duplicate in the batch"},
+                "shop": self.shop.id,
+                "price": "1.00",
+                "in_stock": -1,
+            },
+            {
+                "product": {"title": "Bulk 3", "desc": "Desc"},
+                "shop": self.shop.id,
+                "price": "3.00",
+                "in_stock": 0,
+            },
+        ]
+
+        # Validation lookups, two INSERTs, the summary and version upserts and
+        # the transaction, whatever the size
+        with self.assertNumQueries(9):
+            response = self.client.post(url, data=payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual([item["index"] for item in response.data["created"]], [0, 4])
+        self.assertEqual(
+            [error["index"] for error in response.data["errors"]], [1, 2, 3]
+        )
+        self.assertIn("in_stock", response.data["errors"][2]["errors"])
+        self.assertEqual(
+            ShopProduct.objects.get(product__title="Bulk 3").price, Decimal("3.00")
+        )
+
+    def test_bulk_create_reports_titles_taken_concurrently(self):
+        payload = [
+            {
+                "product": {"title": title, "desc": "Desc"},
+                "shop": self.shop.id,
+                "price": "1.00",
+                "in_stock": 1,
+            }
+            for title in ["Bulk 1", "API Product"]
+        ]
+        lookups = []
+
+        def stale_check(valid):
+            # The first lookups ran before "API Product" was committed
+            lookups.append(valid)
+            if len(lookups) == 1:
+                return list(valid), []
+            return check_shopproducts(valid)
+
+        with mock.patch("apps.goods.bulk.check_shopproducts", stale_check):
+            response = self.client.post(
+                reverse("products-bulk"), data=payload, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual([item["index"] for item in response.data["created"]], [0])
+        [error] = response.data["errors"]
+        self.assertEqual(error["index"], 1)
+        self.assertIn("title", error["errors"]["product"])
+        self.assertTrue(Product.objects.filter(title="Bulk 1").exists())
+
+    def test_bulk_update_prices_and_stock(self):
+        other = Product.objects.create(title="Other", desc="Desc")
+        other_offer = ShopProduct.objects.create(
+            shop=self.shop, product=other, price=5, in_stock=5
+        )
+        url = reverse("products-bulk")
+        self.client.get(reverse("product", args=[self.product.id]))
+
+        payload = [
+            {"shop": self.shop.id, "product": self.product.id, "price": "9.99"},
+            {"shop": self.shop.id, "product": other.id, "in_stock": 0},
+            {"shop": self.shop.id, "product": 0, "price": "1.00"},
+            {"shop": self.shop.id, "product": other.id},
+        ]
+
+        # One SELECT ... FOR UPDATE, one UPDATE, one summary UPDATE and one
+        # version upsert for the batch
+        with self.assertNumQueries(6):
+            response = self.client.patch(url, data=payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            response.data["updated"],
+            [
+                {"index": 0, "ids": [self.shopproduct.id]},
+                {"index": 1, "ids": [other_offer.id]},
+            ],
+        )
+        self.assertEqual(response.data["unmatched"], [2])
+        self.assertEqual(response.data["errors"][0]["index"], 3)
+
+        other_offer.refresh_from_db()
+        self.assertEqual((other_offer.price, other_offer.in_stock), (5, 0))
+
+        response = self.client.get(reverse("product", args=[self.product.id]))
+        self.assertEqual(response.data["price"], "9.99")
+        self.assertEqual(response.data["in_stock"], 10)
+
+    def test_bulk_update_locks_only_the_given_offers(self):
+        other_shop = Shop.objects.create(title="Other Shop", desc="Desc")
+        other = Product.objects.create(title="Other", desc="Desc")
+        offers = [
+            ShopProduct.objects.create(shop=shop, product=product, price=1, in_stock=1)
+            for shop, product in [
+                (self.shop, other),
+                (other_shop, self.product),
+                (other_shop, other),
+            ]
+        ]
+
+        rows = lock_shopproducts(
+            {(self.shop.id, self.product.id), (other_shop.id, other.id)}
+        )
+        self.assertEqual(list(rows), [self.shopproduct, offers[2]])
+
+    def test_bulk_create_products_requires_list(self):
+        url = reverse("products-bulk")
+        response = self.client.post(url, data={"product": {}}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_product_by_id(self):
         url = reverse("product", args=[self.product.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["product"]["title"], "API Product")
 
+    def test_get_product_by_id_is_cached(self):
+        url = reverse("product", args=[self.product.id])
+        self.client.get(url)
+
+        # Only the version lookup
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data["product"]["title"], "API Product")
+
+    def test_patch_product_evicts_cached_product(self):
+        url = reverse("product", args=[self.product.id])
+        self.client.get(url)
+
+        self.client.patch(url, {"price": 5}, format="json")
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["price"], "5.00")
+
+    def test_shop_change_evicts_cached_product(self):
+        url = reverse("product", args=[self.product.id])
+        self.client.get(url)
+
+        self.shop.title = "Renamed Shop"
+        self.shop.save()
+        self.shop.responsible_id.add(self.user)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["shop"]["title"], "Renamed Shop")
+        self.assertEqual(len(response.data["shop"]["responsible_id"]), 1)
+
+    def test_shop_change_does_not_write_a_marker_per_offer(self):
+        for i in range(5):
+            product = Product.objects.create(title=f"Offer {i}", desc="Desc")
+            ShopProduct.objects.create(
+                shop=self.shop, product=product, price=1, in_stock=1
+            )
+        self.shop.responsible_id.add(self.user)
+        url = reverse("product", args=[self.product.id])
+        self.client.get(url)
+        markers = ResourceVersion.objects.count()
+
+        # The UPDATE and the markers of the shop and of the products list
+        with self.assertNumQueries(3):
+            self.shop.title = "Renamed Shop"
+            self.shop.save()
+        self.user.first_name = "Renamed"
+        self.user.save()
+
+        # Only the markers of the shop and of the lists moved
+        self.assertEqual(ResourceVersion.objects.count(), markers)
+        response = self.client.get(url)
+        self.assertEqual(response.data["shop"]["title"], "Renamed Shop")
+        self.assertEqual(
+            response.data["shop"]["responsible_id"][0]["first_name"], "Renamed"
+        )
+
+    def test_conditional_get_product_by_id(self):
+        url = reverse("product", args=[self.product.id])
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(url, {"in_stock": 3}, format="json")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_conditional_get_products_list(self):
+        url = reverse("products")
+        response = self.client.get(url)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        product = Product.objects.create(title="Another", desc="Desc")
+        ShopProduct.objects.create(shop=self.shop, product=product, price=1, in_stock=1)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_versions_do_not_depend_on_the_local_cache(self):
+        url = reverse("product", args=[self.product.id])
+        etag = self.client.get(url)["ETag"]
+
+        # Another worker process starts with an empty cache of its own
+        caches[settings.DETAIL_CACHE_ALIAS].clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Called by the import and seed commands from their own process
+        invalidate_all()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(ResourceVersion.objects.exclude(key="all").exists())
+
+    def test_versions_are_written_in_key_order(self):
+        with CaptureQueriesContext(connection) as context:
+            invalidate_details("product", [30, 4, 200])
+
+        [upsert] = context.captured_queries
+        positions = [
+            upsert["sql"].index(f"'{key}'")
+            for key in ["product:200", "product:30", "product:4", "product:list"]
+        ]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_conditional_get_products_list_after_category_change(self):
+        url = reverse("products")
+        phones = Category.objects.create(title="Phones", parent=self.category)
+        params = {"category": self.category.id, "include_descendants": "true"}
+
+        def move_phones_to_root():
+            phones.parent = None
+            phones.save()
+
+        for change in (
+            lambda: phones.products.add(self.product),
+            lambda: self.product.categories.remove(phones),
+            move_phones_to_root,
+            self.category.delete,
+        ):
+            etag = self.client.get(url, params)["ETag"]
+            change()
+
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_patch_product(self):
         url = reverse("product", args=[self.product.id])
         response = self.client.patch(url, {"price": 888.88}, format="json")
@@ -105,6 +725,21 @@ class GoodsAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("Gadgets", str(response.data))
 
+    def test_get_categories_query_count_does_not_depend_on_depth(self):
+        parent = self.category
+        for i in range(5):
+            parent = Category.objects.create(title=f"Level {i}", parent=parent)
+            parent.products.add(self.product)
+
+        url = reverse("categories")
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"][-1]["full_path"],
+            "Gadgets > Level 0 > Level 1 > Level 2 > Level 3 > Level 4",
+        )
+
     def test_create_category(self):
         url = reverse("categories")
         response = self.client.post(
@@ -118,3 +753,570 @@ class GoodsAPITest(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["title"], "Gadgets")
+
+    def test_parent_rename_evicts_cached_subcategory(self):
+        child = Category.objects.create(title="Watches", parent=self.category)
+        url = reverse("category", args=[child.id])
+        self.client.get(url)
+
+        self.category.title = "Wearables"
+        self.category.save()
+        self.product.categories.add(child)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["full_path"], "Wearables > Watches")
+        self.assertEqual(response.data["products"], [self.product.id])
+
+    def test_get_products_list_sparse_fieldset(self):
+        response = self.client.get(
+            reverse("products"), {"fields": "id,price,product.title"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": self.shopproduct.id,
+                    "product": {"title": "API Product"},
+                    "price": "199.99",
+                }
+            ],
+        )
+
+    def test_get_products_list_without_expansion_skips_joins(self):
+        self.shop.responsible_id.add(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("products"), {"expand": ""})
+
+        self.assertEqual(response.data["results"][0]["product"], self.product.id)
+        self.assertEqual(response.data["results"][0]["shop"], self.shop.id)
+        listing = [q["sql"] for q in queries if "goods_shopproduct" in q["sql"]]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn("JOIN", listing[0])
+
+    def test_get_products_list_renders_unexpanded_responsibles_as_ids(self):
+        self.shop.responsible_id.add(self.user)
+
+        response = self.client.get(
+            reverse("products"), {"expand": "shop", "fields": "shop.responsible_id"}
+        )
+        self.assertEqual(
+            response.data["results"][0], {"shop": {"responsible_id": [self.user.id]}}
+        )
+
+    async def test_async_products_list_filters_and_matches_sync(self):
+        cheap = await Product.objects.acreate(title="Cheap Product", desc="Desc")
+        await ShopProduct.objects.acreate(
+            shop=self.shop, product=cheap, price=5, in_stock=1
+        )
+        await self.shop.responsible_id.aadd(self.user)
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(
+            reverse("async-products"), {"max_price": 100}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual([item["product"]["title"] for item in results], [cheap.title])
+
+        sync_response = await sync_to_async(self.client.get)(
+            reverse("product", args=[cheap.id])
+        )
+        self.assertEqual(results[0], json.loads(sync_response.content))
+
+    async def test_async_products_list_filters_by_category_subtree(self):
+        phones = await Category.objects.acreate(title="Phones", parent=self.category)
+        await phones.products.aadd(self.product)
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(
+            reverse("async-products"),
+            {"category": self.category.id, "include_descendants": "true"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual([item["product"]["id"] for item in results], [self.product.id])
+
+    async def test_async_product_detail(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse("async-product", args=[self.product.id])
+
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["product"]["title"], "API Product")
+
+        response = await self.async_client.get(reverse("async-product", args=[0]))
+        self.assertEqual(response.json(), {"message": "This product does not exist!"})
+
+    def test_malformed_json_body_is_rejected(self):
+        response = self.client.post(
+            reverse("products"), data="{bad", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("JSON parse error", response.data["detail"])
+
+    def test_catalog_export_requires_superuser(self):
+        response = self.client.get(reverse("catalog-export"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_catalog_export_streams_ndjson(self):
+        superuser = User.objects.create_superuser(
+            first_name="admin",
+            last_name="adminov",
+            email="admin@example.com",
+            password="pass1234",
+            role="SUPERUSER",
+        )
+        self.client.force_authenticate(user=superuser)
+        self.category.products.add(self.product)
+
+        response = self.client.get(
+            reverse("catalog-export"), {"export_format": "ndjson"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "product_id": self.product.id,
+                    "title": "API Product",
+                    "desc": "Some product",
+                    "shop_id": self.shop.id,
+                    "shop_title": "Test Shop",
+                    "price": "199.99",
+                    "in_stock": 10,
+                    "categories": ["Gadgets"],
+                }
+            ],
+        )
+
+
+# Management commands
+class QueryInstrumentationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            first_name="admin",
+            last_name="admin",
+            email="admin@example.com",
+            password="pass1234",
+        )
+        self.client.force_authenticate(user=self.user)
+        shop = Shop.objects.create(title="Timed Shop")
+        product = Product.objects.create(title="Timed", desc="Desc")
+        ShopProduct.objects.create(shop=shop, product=product, price=1, in_stock=1)
+
+    @override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_sampled_request_reports_queries(self):
+        with self.assertLogs("core.queries", level="INFO") as logs:
+            response = self.client.get(reverse("products"))
+
+        self.assertEqual(response["X-DB-Queries"], "3")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="3 queries", app;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+        [record] = logs.records
+        self.assertEqual(
+            (record.path, record.status, record.db_queries), ("/products/", 200, 3)
+        )
+        # Any of the three may be the slowest, the version lookup included
+        self.assertTrue(record.slowest_sql.startswith("SELECT"))
+
+    @override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        response = self.client.get(reverse("products"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-DB-Queries", response)
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=1)
+    async def test_overlapping_requests_are_measured_apart(self):
+        released = asyncio.Event()
+
+        async def view(request):
+            for _ in range(request.queries):
+                await Product.objects.acount()
+            # The first request is still measured while the second queries
+            if request.queries == 1:
+                await released.wait()
+            else:
+                released.set()
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(view)
+        requests = [RequestFactory().get("/"), RequestFactory().get("/")]
+        for queries, request in enumerate(requests, 1):
+            request.queries = queries
+
+        with self.assertLogs("core.queries", level="INFO"):
+            first, second = await asyncio.gather(*map(middleware, requests))
+        self.assertEqual((first["X-DB-Queries"], second["X-DB-Queries"]), ("1", "2"))
+
+
+@skipUnless(metrics.prometheus_client, "prometheus_client is not installed")
+class MetricsTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            first_name="admin",
+            last_name="admin",
+            email="admin@example.com",
+            password="pass1234",
+        )
+        self.client.force_authenticate(user=self.user)
+        shop = Shop.objects.create(title="Metered Shop")
+        self.product = Product.objects.create(title="Metered", desc="Desc")
+        ShopProduct.objects.create(shop=shop, product=self.product, price=1, in_stock=1)
+
+    def sample(self, name, **labels):
+        registry = metrics.prometheus_client.REGISTRY
+        return registry.get_sample_value(name, labels) or 0
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requests_and_cache_lookups_are_counted(self):
+        labels = {"view": "product", "method": "GET"}
+        requests = self.sample("http_requests_total", status="200", **labels)
+        observed = self.sample("http_request_db_queries_count", **labels)
+        hits = self.sample("detail_cache_lookups_total", kind="product", result="hit")
+
+        url = reverse("product", args=[self.product.id])
+        self.client.get(url)
+        self.client.get(url)
+
+        self.assertEqual(
+            self.sample("http_requests_total", status="200", **labels), requests + 2
+        )
+        self.assertEqual(
+            self.sample("http_request_db_queries_count", **labels), observed + 2
+        )
+        self.assertEqual(
+            self.sample("detail_cache_lookups_total", kind="product", result="hit"),
+            hits + 1,
+        )
+
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            b'http_request_duration_seconds_bucket{le="0.005",method="GET",'
+            b'view="product"}',
+            response.content,
+        )
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_are_not_served_without_token(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_require_token_when_set(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class InventorySummaryTest(TestCase):
+    def setUp(self):
+        self.shop = Shop.objects.create(title="Inventory Shop")
+        self.phone = Product.objects.create(title="Phone", desc="Smart")
+        self.cable = Product.objects.create(title="Cable", desc="USB")
+
+    def assertSummary(self, offers, units, value, total, out_of_stock):
+        summary = ShopInventorySummary.objects.get(shop=self.shop)
+        self.assertEqual(
+            (
+                summary.offers_count,
+                summary.units_in_stock,
+                summary.stock_value,
+                summary.price_total,
+                summary.out_of_stock_count,
+            ),
+            (offers, units, Decimal(value), Decimal(total), out_of_stock),
+        )
+
+    def test_summary_follows_offer_writes(self):
+        offer = ShopProduct.objects.create(
+            shop=self.shop, product=self.phone, price=Decimal("10.00"), in_stock=3
+        )
+        ShopProduct.objects.create(
+            shop=self.shop, product=self.cable, price=Decimal("2.50"), in_stock=0
+        )
+        self.assertSummary(2, 3, "30.00", "12.50", 1)
+
+        offer.price, offer.in_stock = Decimal("12.00"), 0
+        offer.save()
+        self.assertSummary(2, 0, "0.00", "14.50", 2)
+
+        offer.delete()
+        self.assertSummary(1, 0, "0.00", "2.50", 1)
+
+    def test_shop_delete_does_not_work_per_offer(self):
+        def delete_shop_with_offers(count):
+            shop = Shop.objects.create(title=f"Shop of {count}")
+            for i in range(count):
+                product = Product.objects.create(title=f"{count} {i}", desc="Desc")
+                ShopProduct.objects.create(
+                    shop=shop, product=product, price=1, in_stock=1
+                )
+            with CaptureQueriesContext(connection) as context:
+                shop.delete()
+            return len(context.captured_queries)
+
+        self.assertEqual(delete_shop_with_offers(2), delete_shop_with_offers(50))
+        self.assertFalse(ShopInventorySummary.objects.exists())
+
+    def test_offer_moved_to_another_shop(self):
+        other = Shop.objects.create(title="Other Shop")
+        offer = ShopProduct.objects.create(
+            shop=self.shop, product=self.phone, price=Decimal("10.00"), in_stock=3
+        )
+
+        offer.shop = other
+        offer.save()
+
+        self.assertSummary(0, 0, "0.00", "0.00", 0)
+        self.assertEqual(ShopInventorySummary.objects.get(shop=other).offers_count, 1)
+
+    def test_bulk_writes_update_summary(self):
+        create_shopproducts(
+            [
+                {
+                    "product": {"title": "Tablet", "desc": "Desc"},
+                    "shop": self.shop.id,
+                    "price": "4.00",
+                    "in_stock": 2,
+                },
+                {
+                    "product": {"title": "Laptop", "desc": "Desc"},
+                    "shop": self.shop.id,
+                    "price": "6.00",
+                    "in_stock": 0,
+                },
+            ]
+        )
+        self.assertSummary(2, 2, "8.00", "10.00", 1)
+
+        tablet = Product.objects.get(title="Tablet")
+        update_shopproducts(
+            [{"shop": self.shop.id, "product": tablet.id, "in_stock": 5}]
+        )
+        self.assertSummary(2, 5, "20.00", "10.00", 1)
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        ShopProduct.objects.create(
+            shop=self.shop, product=self.phone, price=Decimal("10.00"), in_stock=3
+        )
+        ShopInventorySummary.objects.filter(shop=self.shop).update(units_in_stock=7)
+
+        out = StringIO()
+        call_command("reconcile_inventory", "--dry-run", stdout=out)
+        self.assertIn(f"Shop {self.shop.id}: units_in_stock 7 -> 3", out.getvalue())
+        self.assertSummary(1, 7, "30.00", "10.00", 0)
+
+        call_command("reconcile_inventory", stdout=StringIO())
+        self.assertSummary(1, 3, "30.00", "10.00", 0)
+
+        out = StringIO()
+        call_command("reconcile_inventory", stdout=out)
+        self.assertIn("Inventory summaries are in sync", out.getvalue())
+
+    def test_reconcile_creates_missing_summaries(self):
+        ShopProduct.objects.create(
+            shop=self.shop, product=self.phone, price=Decimal("10.00"), in_stock=3
+        )
+        ShopInventorySummary.objects.all().delete()
+
+        out = StringIO()
+        call_command("reconcile_inventory", "--dry-run", stdout=out)
+        self.assertIn(f"Shop {self.shop.id}: summary is missing", out.getvalue())
+        self.assertFalse(ShopInventorySummary.objects.exists())
+
+        call_command("reconcile_inventory", stdout=StringIO())
+        self.assertSummary(1, 3, "30.00", "10.00", 0)
+
+
+class ExportCatalogCommandTest(TestCase):
+    def test_export_csv_includes_products_without_offers(self):
+        shop = Shop.objects.create(title="Export Shop")
+        phone = Product.objects.create(title="Phone", desc="Smart")
+        cable = Product.objects.create(title="Cable", desc="USB")
+        ShopProduct.objects.create(
+            shop=shop, product=phone, price=Decimal("5.00"), in_stock=3
+        )
+        parent = Category.objects.create(title="Gadgets")
+        Category.objects.create(title="Phones", parent=parent).products.add(phone)
+        parent.products.add(phone)
+
+        out = StringIO()
+        call_command("export_catalog", "--chunk-size", "1", stdout=out)
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "product_id,title,desc,shop_id,shop_title,price,in_stock,categories",
+                f"{phone.id},Phone,Smart,{shop.id},Export Shop,5.00,3,"
+                "Gadgets; Gadgets > Phones",
+                f"{cable.id},Cable,USB,,,,,",
+            ],
+        )
+
+
+class SeedCatalogCommandTest(TestCase):
+    def test_seed_catalog(self):
+        out = StringIO()
+        call_command(
+            "seed_catalog",
+            "--shops",
+            "2",
+            "--products",
+            "20",
+            "--categories-depth",
+            "2",
+            "--categories-width",
+            "2",
+            stdout=out,
+        )
+
+        self.assertIn(
+            "products: 20, offers: 20, category assignments: 20", out.getvalue()
+        )
+        self.assertEqual(Shop.objects.count(), 2)
+        self.assertEqual(Shop.responsible_id.through.objects.count(), 6)
+        self.assertEqual(ShopProduct.objects.count(), 20)
+
+        for category in Category.objects.filter(depth=1):
+            self.assertEqual(category.path, category.parent.descendants_path)
+            self.assertEqual(
+                category.full_path, f"{category.parent.title} > {category.title}"
+            )
+        # Products are assigned to the leaves
+        self.assertEqual(
+            Category.products.through.objects.filter(category__depth=1).count(), 20
+        )
+
+        self.assertEqual(
+            sum(ShopInventorySummary.objects.values_list("offers_count", flat=True)),
+            20,
+        )
+        # The sequences were moved past the given ids
+        Product.objects.create(title="After seeding")
+
+    def test_seed_catalog_without_categories(self):
+        out = StringIO()
+        call_command(
+            "seed_catalog",
+            "--shops",
+            "1",
+            "--products",
+            "5",
+            "--categories-depth",
+            "0",
+            stdout=out,
+        )
+
+        self.assertIn("categories: 0, products: 5, offers: 5", out.getvalue())
+        self.assertNotIn("category assignments", out.getvalue())
+        self.assertFalse(Category.products.through.objects.exists())
+
+
+@skipUnless(connection.vendor == "postgresql", "import_catalog requires PostgreSQL")
+class ImportCatalogCommandTest(TestCase):
+    def setUp(self):
+        self.shop = Shop.objects.create(title="Import Shop")
+        self.product = Product.objects.create(title="Phone", desc="Old")
+        self.category = Category.objects.create(title="Gadgets")
+
+    def write_file(self, suffix, content):
+        file = tempfile.NamedTemporaryFile(
+            "w", suffix=suffix, delete=False, encoding="utf-8"
+        )
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def import_catalog(self, *args):
+        out = StringIO()
+        call_command("import_catalog", *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_products_from_csv(self):
+        path = self.write_file(
+            ".csv", "title,desc\nPhone,First\nTablet,New\nPhone,Last\n"
+        )
+        self.import_catalog("products", path, "--chunk-size", "2")
+
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(Product.objects.get(title="Phone").desc, "Last")
+        self.assertEqual(Product.objects.get(title="Tablet").desc, "New")
+
+    def test_import_offers_from_ndjson(self):
+        ShopProduct.objects.create(
+            shop=self.shop, product=self.product, price=Decimal("10.00"), in_stock=1
+        )
+        Product.objects.create(title="Tablet")
+        rows = [
+            {
+                "shop_id": self.shop.id,
+                "product_title": "Phone",
+                "price": "12.50",
+                "in_stock": 4,
+            },
+            {
+                "shop_id": self.shop.id,
+                "product_title": "Tablet",
+                "price": "99.00",
+                "in_stock": 2,
+            },
+            {
+                "shop_id": self.shop.id,
+                "product_title": "Missing",
+                "price": "1.00",
+                "in_stock": 1,
+            },
+        ]
+        path = self.write_file(".ndjson", "\n".join(map(json.dumps, rows)))
+        output = self.import_catalog("offers", path)
+
+        self.assertIn("offers updated: 1, offers created: 1, skipped: 1", output)
+        offer = ShopProduct.objects.get(shop=self.shop, product=self.product)
+        self.assertEqual((offer.price, offer.in_stock), (Decimal("12.50"), 4))
+        self.assertEqual(ShopProduct.objects.count(), 2)
+        summary = ShopInventorySummary.objects.get(shop=self.shop)
+        self.assertEqual((summary.offers_count, summary.units_in_stock), (2, 6))
+
+    def test_import_category_assignments(self):
+        self.category.products.add(self.product)
+        path = self.write_file(
+            ".csv",
+            f"category_id,product_title\n{self.category.id},Phone\n"
+            f"{self.category.id},Missing\n",
+        )
+        output = self.import_catalog("categories", path)
+
+        self.assertIn("assignments created: 0", output)
+        self.assertEqual(list(self.category.products.all()), [self.product])
+
+    def test_interrupted_import_resumes_from_staged_rows(self):
+        path = self.write_file(".csv", "title,desc\nTablet,New\nLaptop,New\n")
+        merge = "apps.goods.management.commands.import_catalog.Command.merge_products"
+        with mock.patch(merge, side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_catalog("products", path, "--chunk-size", "1")
+
+        output = self.import_catalog("products", path)
+
+        self.assertIn("Resuming after 2 staged rows", output)
+        self.assertEqual(Product.objects.count(), 3)
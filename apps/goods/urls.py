@@ -2,14 +2,20 @@ from django.urls import path
 
 from apps.goods.views import (
     ProductsAPIView,
+    ProductsBulkAPIView,
     ProductAPIView,
     CategoriesAPIView,
     CategoryAPIView,
+    CatalogExportAPIView,
+    AsyncProductsView,
+    AsyncProductView,
 )
 
 
 urlpatterns = [
     path("products/", ProductsAPIView.as_view(), name="products"),
+    path("products/bulk/", ProductsBulkAPIView.as_view(), name="products-bulk"),
+    path("catalog/export/", CatalogExportAPIView.as_view(), name="catalog-export"),
     path("products/<int:id>/", ProductAPIView.as_view(), name="product"),
     path(
         "categories/",
@@ -17,4 +23,8 @@ urlpatterns = [
         name="categories",
     ),
     path("categories/<int:id>/", CategoryAPIView.as_view(), name="category"),
+    path("async/products/", AsyncProductsView.as_view(), name="async-products"),
+    path(
+        "async/products/<int:id>/", AsyncProductView.as_view(), name="async-product"
+    ),
 ]
@@ -1,3 +1,4 @@
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import permissions
@@ -6,16 +7,48 @@ from apps.goods.serializers import (
     ShopProductSerializer,
     CategorySerializer,
     CreateShopProductSerializer,
+    BulkCreateShopProductSerializer,
+    BulkUpdateShopProductSerializer,
 )
 from apps.goods.models import ShopProduct, Category
-from apps.goods.schema_examples import PRODUCT_PARAM_EXAMPLE, CATEGORY_PARAM_EXAMPLE
+from apps.goods.schema_examples import (
+    PRODUCT_PARAM_EXAMPLE,
+    CATEGORY_PARAM_EXAMPLE,
+    EXPORT_PARAM_EXAMPLE,
+)
 from apps.goods.filters import CategoryFilter, ProductFilter
+from apps.goods.projections import CategoryProjection, ShopProductProjection
+from apps.goods.export import (
+    EXPORT_CONTENT_TYPES,
+    EXPORT_FORMATS,
+    iter_catalog_export,
+)
+from apps.goods.bulk import (
+    BULK_MAX_ITEMS,
+    create_shopproducts,
+    update_shopproducts,
+)
+from apps.accounts.permissions import IsSuperUser
+from core.async_views import AsyncAPIView
+from core.cache import (
+    aget_cached_detail,
+    aget_version,
+    aset_cached_detail,
+    get_cached_detail,
+    get_request_version,
+    set_cached_detail,
+    versioned_resource,
+)
+from core.pagination import IdCursorPagination
+from core.serializers import get_sparse_fieldset, optimize_queryset
+from core.streaming import get_stream_format, stream_response
 
 from drf_spectacular.utils import extend_schema
 
 
 class ProductsAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdCursorPagination
 
     def get_serializer_class(self):
         if self.request.method == "GET":
@@ -29,14 +62,38 @@ class ProductsAPIView(APIView):
         description="This endpoint allows user to get products between max_price and min_price",
         parameters=PRODUCT_PARAM_EXAMPLE,
     )
+    @versioned_resource("product")
     def get(self, request):
-        products = ShopProduct.objects.select_related("product", "shop").all()
+        sparse_fieldset = get_sparse_fieldset(request)
+
+        if sparse_fieldset["fields"] is None and sparse_fieldset["expand"] is None:
+            # The full schema is rendered from values() without serializers
+            serializer_class = ShopProductProjection
+            serializer_kwargs = {}
+            products = ShopProductProjection.values(ShopProduct.objects.all())
+        else:
+            serializer_class = self.get_serializer_class()
+            serializer_kwargs = sparse_fieldset
+            # The joins, prefetches and columns follow ?fields= and ?expand=
+            products = optimize_queryset(
+                ShopProduct.objects.all(), serializer_class(**sparse_fieldset)
+            )
 
         filterset = ProductFilter(request.query_params, queryset=products)
         if filterset.is_valid():
-            queryset = filterset.qs
-            serializer = self.get_serializer_class()(queryset, many=True)
-            return Response(data=serializer.data, status=200)
+            stream_format = get_stream_format(request)
+            if stream_format:
+                return stream_response(
+                    filterset.qs.order_by("id"),
+                    serializer_class,
+                    stream_format,
+                    serializer_kwargs=serializer_kwargs,
+                )
+
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(filterset.qs, request, view=self)
+            serializer = serializer_class(page, many=True, **serializer_kwargs)
+            return paginator.get_paginated_response(serializer.data)
         return Response(filterset.errors, status=400)
 
     @extend_schema(
@@ -59,6 +116,91 @@ class ProductsAPIView(APIView):
         )
 
 
+class ProductsBulkAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_serializer_class(self):
+        if self.request.method == "POST":
+            return BulkCreateShopProductSerializer
+        elif self.request.method == "PATCH":
+            return BulkUpdateShopProductSerializer
+
+    def get_items(self, request):
+        items = request.data
+
+        if isinstance(items, list) and 0 < len(items) <= BULK_MAX_ITEMS:
+            return items
+        return None
+
+    @extend_schema(
+        summary="Create the products in bulk",
+        description="This endpoint allows user to create up to "
+        f"{BULK_MAX_ITEMS} products at once and reports errors per item",
+        request=BulkCreateShopProductSerializer(many=True),
+    )
+    def post(self, request):
+        items = self.get_items(request)
+
+        if items is None:
+            return Response(
+                data={"message": f"Send a list of 1 to {BULK_MAX_ITEMS} products!"},
+                status=400,
+            )
+
+        created, errors = create_shopproducts(items)
+        return Response(data={"created": created, "errors": errors}, status=200)
+
+    @extend_schema(
+        summary="Change prices and stock of the products in bulk",
+        description="This endpoint allows user to change price and in_stock of up "
+        f"to {BULK_MAX_ITEMS} products at once, keyed by shop and product ids",
+        request=BulkUpdateShopProductSerializer(many=True),
+    )
+    def patch(self, request):
+        items = self.get_items(request)
+
+        if items is None:
+            return Response(
+                data={"message": f"Send a list of 1 to {BULK_MAX_ITEMS} changes!"},
+                status=400,
+            )
+
+        updated, unmatched, errors = update_shopproducts(items)
+        return Response(
+            data={"updated": updated, "unmatched": unmatched, "errors": errors},
+            status=200,
+        )
+
+
+class CatalogExportAPIView(APIView):
+    permission_classes = [IsSuperUser]
+
+    @extend_schema(
+        summary="Export the whole catalog",
+        description="This endpoint allows superuser to download every product "
+        "with its shop offers and category paths as CSV or NDJSON",
+        parameters=EXPORT_PARAM_EXAMPLE,
+        responses={(200, "text/csv"): str, (200, "application/x-ndjson"): str},
+    )
+    def get(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                data={"message": f"export_format must be one of {EXPORT_FORMATS}!"},
+                status=400,
+            )
+
+        response = StreamingHttpResponse(
+            iter_catalog_export(export_format),
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="catalog.{export_format}"'
+        )
+        return response
+
+
 class ProductAPIView(APIView):
     serializer_class = ShopProductSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -76,11 +218,18 @@ class ProductAPIView(APIView):
         summary="Get product by id",
         description="This endpoint allows user to get product by id",
     )
+    @versioned_resource("product", pk_kwarg="id")
     def get(self, request, *args, **kwargs):
+        version = get_request_version(request, "product", kwargs["id"])
+        data = get_cached_detail("product", kwargs["id"], version)
+        if data is not None:
+            return Response(data=data, status=200)
+
         shopproduct = self.get_object(kwargs["id"])
 
         if shopproduct:
             serializer = self.serializer_class(shopproduct)
+            set_cached_detail("product", kwargs["id"], version, serializer.data)
             return Response(data=serializer.data, status=200)
 
         return Response(data={"message": "This product does not exist!"})
@@ -106,9 +255,43 @@ class ProductAPIView(APIView):
         return Response(data={"message": "This product does not exist!"}, status=400)
 
 
+class AsyncProductsView(AsyncAPIView):
+    async def get(self, request):
+        products = ShopProduct.objects.select_related(
+            "product", "shop"
+        ).prefetch_related("shop__responsible_id")
+
+        filterset = ProductFilter(request.GET, queryset=products)
+        if filterset.is_valid():
+            return await self.paginate(request, filterset.qs, ShopProductSerializer)
+        return self.render(filterset.errors, status=400)
+
+
+class AsyncProductView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        version = await aget_version("product", kwargs["id"])
+        data = await aget_cached_detail("product", kwargs["id"], version)
+        if data is not None:
+            return self.render(data)
+
+        try:
+            shopproduct = (
+                await ShopProduct.objects.select_related("product", "shop")
+                .prefetch_related("shop__responsible_id")
+                .aget(product__id__exact=kwargs["id"])
+            )
+        except ShopProduct.DoesNotExist:
+            return self.render({"message": "This product does not exist!"})
+
+        data = ShopProductSerializer(shopproduct).data
+        await aset_cached_detail("product", kwargs["id"], version, data)
+        return self.render(data)
+
+
 class CategoriesAPIView(APIView):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdCursorPagination
 
     @extend_schema(
         operation_id="get_categories_by_title_and_parent_title",
@@ -116,14 +299,17 @@ class CategoriesAPIView(APIView):
         description="This endpoint allows user to retrieve the categories",
         parameters=CATEGORY_PARAM_EXAMPLE,
     )
+    @versioned_resource("category")
     def get(self, request):
-        categories = Category.objects.select_related("parent").all()
+        categories = CategoryProjection.values(Category.objects.all())
 
         filterset = CategoryFilter(request.query_params, queryset=categories)
         if filterset.is_valid():
-            queryset = filterset.qs
-            serializer = self.serializer_class(queryset, many=True)
-        return Response(data=serializer.data, status=200)
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(filterset.qs, request, view=self)
+            serializer = CategoryProjection(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        return Response(filterset.errors, status=400)
 
     @extend_schema(
         summary="Create the new category",
@@ -159,10 +345,17 @@ class CategoryAPIView(APIView):
         summary="Retrieve the category by id",
         description="This endpoint allows user to retrieve the category by id",
     )
+    @versioned_resource("category", pk_kwarg="id")
     def get(self, request, *args, **kwargs):
+        version = get_request_version(request, "category", kwargs["id"])
+        data = get_cached_detail("category", kwargs["id"], version)
+        if data is not None:
+            return Response(data=data, status=200)
+
         category = self.get_object(id=kwargs["id"])
 
         if category:
             serializer = self.serializer_class(category)
+            set_cached_detail("category", kwargs["id"], version, serializer.data)
             return Response(data=serializer.data, status=200)
         return Response(data={"message": "This category does not exist!"}, status=404)
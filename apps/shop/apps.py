@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.shop"
+
+    def ready(self):
+        from apps.shop import signals  # noqa: F401
@@ -1,11 +1,29 @@
 import django_filters
 
 from apps.shop.models import Shop
+from core.search import search_by_title
 
 
 class ShopFilter(django_filters.FilterSet):
-    title = django_filters.CharFilter(lookup_expr="icontains")
+    title = django_filters.CharFilter(method="filter_title")
 
     class Meta:
         model = Shop
         fields = ["title"]
+
+    def filter_title(self, queryset, name, value):
+        return search_by_title(queryset, name, value)
+
+
+class ShopStatsFilter(django_filters.FilterSet):
+    is_active = django_filters.BooleanFilter()
+    category = django_filters.NumberFilter(method="filter_offers")
+    include_descendants = django_filters.BooleanFilter(method="filter_offers")
+
+    class Meta:
+        model = Shop
+        fields = ["is_active"]
+
+    def filter_offers(self, queryset, name, value):
+        # Restricts the offers that are aggregated, not the shops
+        return queryset
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:29
+
+import core.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_alter_shop_image'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='shop',
+            index=core.indexes.TrigramIndex('title', name='shop_title_trgm'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from apps.accounts.models import User
+from core.indexes import TrigramIndex
 
 
 class Shop(models.Model):
@@ -23,5 +24,10 @@ class Shop(models.Model):
     is_active = models.BooleanField(default=True)
     image = models.ImageField(upload_to="shops_images/", null=True)
 
+    class Meta:
+        indexes = [
+            TrigramIndex("title", name="shop_title_trgm"),
+        ]
+
     def __str__(self):
         return f"{self.title}"
@@ -0,0 +1,94 @@
+from collections import defaultdict
+
+from django.db.models import Count
+from django.utils.functional import cached_property
+
+from apps.shop.models import Shop
+
+RESPONSIBLE_FIELDS = ("id", "first_name", "last_name", "email", "is_active", "role")
+SHOP_FIELDS = ("id", "title", "desc", "is_active", "image")
+
+shop_image_storage = Shop._meta.get_field("image").storage
+
+
+def image_url(storage, name):
+    # Same value as DRF's ImageField without a request in the context
+    return storage.url(name) if name else None
+
+
+def get_responsibles(shop_ids):
+    """
+    Returns the responsibles of the shops as ResponsibleSerializer renders
+    them, keyed by shop id, in one query over the through table
+    """
+    columns = [f"user__{name}" for name in RESPONSIBLE_FIELDS]
+    rows = (
+        Shop.responsible_id.through.objects.filter(shop_id__in=shop_ids)
+        .order_by("shop_id", "user_id")
+        .values_list("shop_id", *columns)
+    )
+
+    responsibles = defaultdict(list)
+    for shop_id, *values in rows:
+        responsibles[shop_id].append(dict(zip(RESPONSIBLE_FIELDS, values)))
+    return responsibles
+
+
+def render_shop(values, responsibles):
+    return {
+        "id": values["id"],
+        "responsible_id": responsibles.get(values["id"], []),
+        "title": values["title"],
+        "desc": values["desc"],
+        "is_active": values["is_active"],
+        "image": image_url(shop_image_storage, values["image"]),
+    }
+
+
+class ShopProjection:
+    """
+    Read-only stand-in for ``ShopSerializer(rows, many=True)`` on list pages
+
+    It renders the dicts of ``ShopProjection.values(queryset)`` straight
+    into the output of the serializer, without instantiating models or
+    serializer fields, and loads the responsibles of the page at once.
+    """
+
+    def __init__(self, rows, many=True):
+        self.rows = rows
+
+    @staticmethod
+    def values(queryset):
+        return queryset.values(*SHOP_FIELDS)
+
+    @cached_property
+    def data(self):
+        responsibles = get_responsibles({row["id"] for row in self.rows})
+        return [render_shop(row, responsibles) for row in self.rows]
+
+
+class ShopCountProjection(ShopProjection):
+    """
+    Read-only stand-in for ``ShopCountSerializer(rows, many=True)``, the
+    number of responsibles is counted in the query of the page itself
+    """
+
+    @staticmethod
+    def values(queryset):
+        return queryset.annotate(responsible_count=Count("responsible_id")).values(
+            *SHOP_FIELDS, "responsible_count"
+        )
+
+    @cached_property
+    def data(self):
+        return [
+            {
+                "id": row["id"],
+                "responsible_count": row["responsible_count"],
+                "title": row["title"],
+                "desc": row["desc"],
+                "is_active": row["is_active"],
+                "image": image_url(shop_image_storage, row["image"]),
+            }
+            for row in self.rows
+        ]
@@ -1,5 +1,19 @@
 from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
 
+from core.pagination import CURSOR_PARAM_EXAMPLE
+from core.streaming import STREAM_PARAM_EXAMPLE
+
+RESPONSIBLES_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="responsibles",
+        description="full (default) to embed the responsibles, "
+        "count to return only their number as responsible_count",
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=["full", "count"],
+    ),
+]
+
 SHOP_PARAM_EXAMPLE = [
     OpenApiParameter(
         name="title",
@@ -7,4 +21,29 @@ SHOP_PARAM_EXAMPLE = [
         required=False,
         type=OpenApiTypes.STR,
     )
+] + CURSOR_PARAM_EXAMPLE + STREAM_PARAM_EXAMPLE + RESPONSIBLES_PARAM_EXAMPLE
+
+
+SHOP_STATS_OFFERS_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="category",
+        description="Count only the offers of products in the category with this id",
+        required=False,
+        type=OpenApiTypes.INT,
+    ),
+    OpenApiParameter(
+        name="include_descendants",
+        description="Also count the offers of products in every subcategory",
+        required=False,
+        type=OpenApiTypes.BOOL,
+    ),
 ]
+
+SHOP_STATS_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="is_active",
+        description="Get the statistics of active or inactive shops only",
+        required=False,
+        type=OpenApiTypes.BOOL,
+    ),
+] + SHOP_STATS_OFFERS_PARAM_EXAMPLE + CURSOR_PARAM_EXAMPLE
@@ -2,9 +2,10 @@ from rest_framework import serializers
 
 from apps.shop.models import Shop
 from apps.accounts.serializers import ResponsibleSerializer
+from core.serializers import SparseFieldsetMixin
 
 
-class ShopSerializer(serializers.ModelSerializer):
+class ShopSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     responsible_id = ResponsibleSerializer(many=True, read_only=True)
 
     class Meta:
@@ -12,6 +13,49 @@ class ShopSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class ShopCountSerializer(serializers.ModelSerializer):
+    """
+    Shop with the number of its responsibles instead of their profiles,
+    reads the ``responsible_count`` annotation
+    """
+
+    responsible_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Shop
+        exclude = ["responsible_id"]
+
+
+class ShopStatsSerializer(serializers.ModelSerializer):
+    """
+    Offer statistics of a shop, reads the annotations of ``annotate_stats``
+    """
+
+    offers_count = serializers.IntegerField()
+    units_in_stock = serializers.IntegerField()
+    stock_value = serializers.DecimalField(max_digits=20, decimal_places=2)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    avg_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    out_of_stock_count = serializers.IntegerField()
+
+    class Meta:
+        model = Shop
+        fields = [
+            "id",
+            "title",
+            "is_active",
+            "offers_count",
+            "units_in_stock",
+            "stock_value",
+            "min_price",
+            "max_price",
+            "avg_price",
+            "out_of_stock_count",
+        ]
+        read_only_fields = fields
+
+
 class CreateShopSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=30)
     desc = serializers.CharField(max_length=1000)
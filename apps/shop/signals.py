@@ -0,0 +1,46 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.accounts.models import User
+from apps.shop.models import Shop
+from core.cache import invalidate_details
+
+# Fields of a responsible embedded in the shop payload (ResponsibleSerializer)
+RESPONSIBLE_FIELDS = {"first_name", "last_name", "email", "is_active", "role"}
+
+# clear() does not pass the ids of the other side, so the reverse side is
+# evicted before the rows are removed
+M2M_EVICT_ACTIONS = ("post_add", "post_remove", "post_clear", "pre_clear")
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def evict_shop(sender, instance, **kwargs):
+    invalidate_details("shop", [instance.pk])
+
+
+@receiver(m2m_changed, sender=Shop.responsible_id.through)
+def evict_shop_responsibles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in M2M_EVICT_ACTIONS:
+        return
+
+    if not reverse:
+        invalidate_details("shop", [instance.pk])
+    elif action == "pre_clear":
+        invalidate_details("shop", instance.shop_set.values_list("id", flat=True))
+    elif pk_set:
+        invalidate_details("shop", pk_set)
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def evict_user_shops(sender, instance, update_fields=None, **kwargs):
+    if kwargs.get("created") or (
+        update_fields and not RESPONSIBLE_FIELDS & set(update_fields)
+    ):
+        return
+
+    invalidate_details(
+        "shop",
+        Shop.objects.filter(responsible_id=instance).values_list("id", flat=True),
+    )
@@ -0,0 +1,99 @@
+from django.db.models import (
+    Avg,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, NullIf
+
+from apps.goods.models import Category, ShopProduct
+
+STOCK_VALUE_FIELD = DecimalField(max_digits=20, decimal_places=2)
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def annotate_stats(queryset, category=None, include_descendants=False):
+    """
+    Annotates shops with the statistics of their offers
+
+    Without a category the figures are read from ShopInventorySummary,
+    otherwise they are aggregated over the offers in the category.
+    """
+    if category is None:
+        return annotate_summary_stats(queryset)
+    return annotate_offer_stats(queryset, category, include_descendants)
+
+
+def annotate_summary_stats(queryset):
+    """
+    Annotates shops with the figures of their inventory summary
+
+    The summary is joined by the primary key, min and max price are read
+    from the (shop, price) index, so the cost does not grow with the number
+    of offers. Shops without a summary row get zero counts and null prices.
+    """
+    summary = "inventory_summary__"
+    offers = ShopProduct.objects.filter(shop=OuterRef("pk")).values("price")
+
+    return queryset.annotate(
+        offers_count=Coalesce(F(f"{summary}offers_count"), Value(0)),
+        units_in_stock=Coalesce(F(f"{summary}units_in_stock"), Value(0)),
+        stock_value=Coalesce(
+            F(f"{summary}stock_value"), Value(0), output_field=STOCK_VALUE_FIELD
+        ),
+        min_price=Subquery(offers.order_by("price")[:1], output_field=PRICE_FIELD),
+        max_price=Subquery(offers.order_by("-price")[:1], output_field=PRICE_FIELD),
+        avg_price=ExpressionWrapper(
+            F(f"{summary}price_total")
+            * Value(1.0)
+            / NullIf(F(f"{summary}offers_count"), Value(0)),
+            output_field=PRICE_FIELD,
+        ),
+        out_of_stock_count=Coalesce(F(f"{summary}out_of_stock_count"), Value(0)),
+    )
+
+
+def annotate_offer_stats(queryset, category=None, include_descendants=False):
+    """
+    Annotates shops with the statistics of their offers
+
+    Every figure is a filtered aggregate over the joined offers, so the
+    statistics of a whole page of shops come from one grouped query.
+    Shops without matching offers get zero counts and null prices.
+    """
+    offers = None
+    if category is not None:
+        offers = Q(
+            shopproducts__product__in=Category.objects.product_ids(
+                category, include_descendants
+            )
+        )
+    out_of_stock = Q(shopproducts__in_stock=0)
+    if offers is not None:
+        out_of_stock &= offers
+
+    return queryset.annotate(
+        offers_count=Count("shopproducts", filter=offers),
+        units_in_stock=Coalesce(Sum("shopproducts__in_stock", filter=offers), Value(0)),
+        stock_value=Coalesce(
+            Sum(
+                F("shopproducts__price") * F("shopproducts__in_stock"),
+                filter=offers,
+                output_field=STOCK_VALUE_FIELD,
+            ),
+            Value(0),
+            output_field=STOCK_VALUE_FIELD,
+        ),
+        min_price=Min("shopproducts__price", filter=offers),
+        max_price=Max("shopproducts__price", filter=offers),
+        avg_price=Avg("shopproducts__price", filter=offers),
+        out_of_stock_count=Count("shopproducts", filter=out_of_stock),
+    )
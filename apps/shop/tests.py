@@ -1,11 +1,16 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Prefetch
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 
+from apps.goods.models import Category, Product, ShopInventorySummary, ShopProduct
 from apps.shop.models import Shop
 from apps.accounts.models import User
-from apps.shop.serializers import ShopSerializer
+from apps.shop.projections import ShopCountProjection, ShopProjection
+from apps.shop.serializers import ShopCountSerializer, ShopSerializer
 
 
 # Models
@@ -50,6 +55,42 @@ class ShopSerializerTestCase(TestCase):
         self.assertTrue("responsible_id" in data)
 
 
+class ShopProjectionTestCase(TestCase):
+    def test_shop_projection_matches_serializer(self):
+        users = [
+            User.objects.create_responsible(
+                first_name="Имя",
+                last_name="test",
+                email=f"projection{i}@test.ru",
+                password="testpass",
+            )
+            for i in range(2)
+        ]
+        shop = Shop.objects.create(title="Shop A", desc="A", image="shops/a.png")
+        shop.responsible_id.set(users)
+        Shop.objects.create(title="Shop B", desc="", is_active=False)
+
+        rows = ShopProjection.values(Shop.objects.order_by("id"))
+        shops = Shop.objects.order_by("id").prefetch_related(
+            Prefetch("responsible_id", queryset=User.objects.order_by("id"))
+        )
+
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(ShopProjection(list(rows), many=True).data),
+            renderer.render(ShopSerializer(shops, many=True).data),
+        )
+
+        rows = ShopCountProjection.values(Shop.objects.order_by("id"))
+        shops = Shop.objects.order_by("id").annotate(
+            responsible_count=Count("responsible_id")
+        )
+        self.assertEqual(
+            renderer.render(ShopCountProjection(list(rows), many=True).data),
+            renderer.render(ShopCountSerializer(shops, many=True).data),
+        )
+
+
 # Views
 class ShopViewTestCase(TestCase):
     def setUp(self):
@@ -80,7 +121,8 @@ class ShopViewTestCase(TestCase):
         response = self.client.get(self.shops_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(isinstance(response.data, list))
+        self.assertTrue(isinstance(response.data["results"], list))
+        self.assertIn("next", response.data)
 
     def test_get_shop_detail(self):
         self.client.force_authenticate(user=self.user)
@@ -89,6 +131,166 @@ class ShopViewTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["title"], "Cool Store")
 
+    def test_get_shop_detail_is_cached_until_changed(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.shop_detail_url)
+
+        # Only the version lookup
+        with self.assertNumQueries(1):
+            self.client.get(self.shop_detail_url)
+
+        self.superuser.first_name = "Renamed"
+        self.superuser.save()
+
+        response = self.client.get(self.shop_detail_url)
+        self.assertEqual(response.data["responsible_id"][0]["first_name"], "Renamed")
+
+    def test_conditional_get_shops_list(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.shops_url)
+        last_modified = response["Last-Modified"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.shops_url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_shops_list_query_count_is_constant(self):
+        for i in range(5):
+            shop = Shop.objects.create(title=f"Store {i}", desc="Stuff")
+            shop.responsible_id.set([self.user, self.superuser])
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.shops_url)
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertEqual(len(response.data["results"][-1]["responsible_id"]), 2)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.shops_url, {"responsibles": "count"})
+        self.assertEqual(
+            [shop["responsible_count"] for shop in response.data["results"]],
+            [1, 2, 2, 2, 2, 2],
+        )
+        self.assertNotIn("responsible_id", response.data["results"][0])
+
+    def test_get_shop_detail_responsible_count(self):
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.shop_detail_url)
+        self.assertEqual(
+            list(response.data["responsible_id"][0]),
+            ["id", "first_name", "last_name", "email", "is_active", "role"],
+        )
+
+        response = self.client.get(self.shop_detail_url, {"responsibles": "count"})
+        self.assertEqual(response.data["responsible_count"], 1)
+        self.assertNotIn("responsible_id", response.data)
+
+    def create_offers(self):
+        gadgets = Category.objects.create(title="Gadgets")
+        phones = Category.objects.create(title="Phones", parent=gadgets)
+        for title, price, in_stock, category in [
+            ("Phone", "10.00", 2, phones),
+            ("Tablet", "20.00", 0, gadgets),
+            ("Cable", "30.50", 1, None),
+        ]:
+            product = Product.objects.create(title=title, desc="Desc")
+            ShopProduct.objects.create(
+                shop=self.shop, product=product, price=price, in_stock=in_stock
+            )
+            if category is not None:
+                category.products.add(product)
+        return gadgets
+
+    def test_shops_stats_in_one_query(self):
+        self.create_offers()
+        empty = Shop.objects.create(title="Empty", desc="None", is_active=False)
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("shops-stats"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats, empty_stats = response.data["results"]
+        self.assertEqual(stats["offers_count"], 3)
+        self.assertEqual(stats["units_in_stock"], 3)
+        self.assertEqual(stats["stock_value"], "50.50")
+        self.assertEqual(stats["min_price"], "10.00")
+        self.assertEqual(stats["max_price"], "30.50")
+        self.assertEqual(stats["avg_price"], "20.17")
+        self.assertEqual(stats["out_of_stock_count"], 1)
+        self.assertEqual(empty_stats["id"], empty.id)
+        self.assertEqual(empty_stats["offers_count"], 0)
+        self.assertEqual(empty_stats["stock_value"], "0.00")
+        self.assertIsNone(empty_stats["avg_price"])
+
+        response = self.client.get(reverse("shops-stats"), {"is_active": "false"})
+        self.assertEqual([shop["id"] for shop in response.data["results"]], [empty.id])
+
+    def test_shops_stats_read_the_inventory_summary(self):
+        gadgets = self.create_offers()
+        ShopInventorySummary.objects.filter(shop=self.shop).update(units_in_stock=100)
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("shops-stats"))
+        self.assertEqual(response.data["results"][0]["units_in_stock"], 100)
+
+        # Offers of a category are still aggregated from the offers table
+        response = self.client.get(reverse("shops-stats"), {"category": gadgets.id})
+        self.assertEqual(response.data["results"][0]["units_in_stock"], 0)
+
+    def test_shop_stats_by_category(self):
+        gadgets = self.create_offers()
+        self.client.force_authenticate(user=self.user)
+        url = reverse("shop-stats", args=[self.shop.id])
+
+        response = self.client.get(url, {"category": gadgets.id})
+        self.assertEqual(response.data["offers_count"], 1)
+        self.assertEqual(response.data["out_of_stock_count"], 1)
+
+        response = self.client.get(
+            url, {"category": gadgets.id, "include_descendants": "true"}
+        )
+        self.assertEqual(response.data["offers_count"], 2)
+        self.assertEqual(response.data["units_in_stock"], 2)
+        self.assertEqual(response.data["stock_value"], "20.00")
+
+    async def test_async_shops_list_pages_by_id(self):
+        second = await Shop.objects.acreate(title="Second Store", desc="More")
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(reverse("async-shops"), {"page_size": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = response.json()
+        self.assertEqual([shop["id"] for shop in page["results"]], [self.shop.id])
+        self.assertEqual(
+            page["results"][0]["responsible_id"][0]["email"], "test2@test.ru"
+        )
+
+        response = await self.async_client.get(page["next"])
+        page = response.json()
+        self.assertEqual([shop["id"] for shop in page["results"]], [second.id])
+        self.assertIsNone(page["next"])
+
+    async def test_async_shop_detail_matches_sync_endpoint(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            reverse("async-shop", args=[self.shop.id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        await sync_to_async(self.client.force_authenticate)(user=self.user)
+        sync_response = await sync_to_async(self.client.get)(self.shop_detail_url)
+        self.assertEqual(response.content, sync_response.content)
+
+    async def test_async_shops_list_requires_authentication(self):
+        response = await self.async_client.get(reverse("async-shops"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_create_shop_as_superuser(self):
         self.client.force_authenticate(user=self.superuser)
 
@@ -128,6 +330,9 @@ class ShopViewTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["desc"], "Updated Description")
 
+        response = self.client.get(self.shop_detail_url)
+        self.assertEqual(response.data["desc"], "Updated Description")
+
     def test_patch_shop_as_user_forbidden(self):
         self.client.force_authenticate(user=self.user)
 
@@ -1,9 +1,20 @@
 from django.urls import path
 
-from apps.shop.views import ShopAPIView, ShopsAPIView
+from apps.shop.views import (
+    ShopAPIView,
+    ShopsAPIView,
+    ShopStatsAPIView,
+    ShopsStatsAPIView,
+    AsyncShopView,
+    AsyncShopsView,
+)
 
 
 urlpatterns = [
     path("<int:id>/", ShopAPIView.as_view(), name="shop"),
+    path("<int:id>/stats/", ShopStatsAPIView.as_view(), name="shop-stats"),
+    path("stats/", ShopsStatsAPIView.as_view(), name="shops-stats"),
     path("", ShopsAPIView.as_view(), name="shops"),
+    path("async/<int:id>/", AsyncShopView.as_view(), name="async-shop"),
+    path("async/", AsyncShopsView.as_view(), name="async-shops"),
 ]
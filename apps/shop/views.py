@@ -1,18 +1,53 @@
+from django.db.models import Count, Prefetch
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import permissions
 
 from apps.shop.models import Shop
-from apps.shop.serializers import ShopSerializer, CreateShopSerializer
+from apps.shop.serializers import (
+    ShopSerializer,
+    ShopCountSerializer,
+    ShopStatsSerializer,
+    CreateShopSerializer,
+)
 from apps.accounts.permissions import IsSuperUser
 from apps.accounts.models import User
-from apps.shop.filters import ShopFilter
-from apps.shop.schema_examples import SHOP_PARAM_EXAMPLE
+from apps.shop.filters import ShopFilter, ShopStatsFilter
+from apps.shop.stats import annotate_stats
+from apps.shop.projections import (
+    RESPONSIBLE_FIELDS,
+    ShopCountProjection,
+    ShopProjection,
+)
+from apps.shop.schema_examples import (
+    RESPONSIBLES_PARAM_EXAMPLE,
+    SHOP_PARAM_EXAMPLE,
+    SHOP_STATS_OFFERS_PARAM_EXAMPLE,
+    SHOP_STATS_PARAM_EXAMPLE,
+)
+from core.async_views import AsyncAPIView
+from core.cache import (
+    aget_cached_detail,
+    aget_version,
+    aset_cached_detail,
+    get_cached_detail,
+    get_request_version,
+    set_cached_detail,
+    versioned_resource,
+)
+from core.pagination import IdCursorPagination
+from core.streaming import get_stream_format, stream_response
 
 from drf_spectacular.utils import extend_schema
 
 
+def counts_only(request):
+    return request.query_params.get("responsibles") == "count"
+
+
 class ShopsAPIView(APIView):
+    pagination_class = IdCursorPagination
+
     def get_serializer_class(self):
         if self.request.method == "GET":
             return ShopSerializer
@@ -33,14 +68,24 @@ class ShopsAPIView(APIView):
         description="This endpoint allows user to search shops by title (optional)",
         parameters=SHOP_PARAM_EXAMPLE,
     )
+    @versioned_resource("shop")
     def get(self, request, *args, **kwargs):
-        shops = Shop.objects.prefetch_related("responsible_id").all()
+        # A page costs one query, plus one for the responsibles unless counted
+        projection = ShopCountProjection if counts_only(request) else ShopProjection
+        shops = projection.values(Shop.objects.all())
 
         filterset = ShopFilter(request.query_params, queryset=shops)
         if filterset.is_valid():
-            queryset = filterset.qs
-            serializer = self.get_serializer_class()(queryset, many=True)
-            return Response(data=serializer.data, status=200)
+            stream_format = get_stream_format(request)
+            if stream_format:
+                return stream_response(
+                    filterset.qs.order_by("id"), projection, stream_format
+                )
+
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(filterset.qs, request, view=self)
+            serializer = projection(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         else:
             return Response(filterset.errors, status=400)
 
@@ -81,9 +126,19 @@ class ShopAPIView(APIView):
         elif self.request.method == "PATCH":
             return [IsSuperUser()]
 
-    def get_object(self, id):
+    def get_queryset(self, counts_only=False):
+        if counts_only:
+            return Shop.objects.annotate(responsible_count=Count("responsible_id"))
+
+        # Only the columns ResponsibleSerializer renders
+        responsibles = User.objects.only(*RESPONSIBLE_FIELDS).order_by("id")
+        return Shop.objects.prefetch_related(
+            Prefetch("responsible_id", queryset=responsibles)
+        )
+
+    def get_object(self, id, counts_only=False):
         try:
-            shop = Shop.objects.get(id=id)
+            shop = self.get_queryset(counts_only).get(id=id)
         except Shop.DoesNotExist:
             shop = None
         return shop
@@ -92,12 +147,29 @@ class ShopAPIView(APIView):
         operation_id="shop_detail",
         summary="Retrieve shop detail",
         description="This endpoint allows user to get a shop detail using id",
+        parameters=RESPONSIBLES_PARAM_EXAMPLE,
     )
+    @versioned_resource("shop", pk_kwarg="id")
     def get(self, request, *args, **kwargs):
+        if counts_only(request):
+            shop = self.get_object(id=kwargs["id"], counts_only=True)
+
+            if shop is not None:
+                return Response(data=ShopCountSerializer(shop).data, status=200)
+            return Response(
+                data={"message": "Shop with that identifier does not exist!"}
+            )
+
+        version = get_request_version(request, "shop", kwargs["id"])
+        data = get_cached_detail("shop", kwargs["id"], version)
+        if data is not None:
+            return Response(data=data, status=200)
+
         shop = self.get_object(id=kwargs["id"])
 
         if shop is not None:
             serializer = self.serializer_class(shop)
+            set_cached_detail("shop", kwargs["id"], version, serializer.data)
             return Response(data=serializer.data, status=200)
 
         return Response(data={"message": "Shop with that identifier does not exist!"})
@@ -118,3 +190,93 @@ class ShopAPIView(APIView):
 
             return Response(data={"message": "Error, check your details!"}, status=400)
         return Response(data={"message": "This shop does not exist!"}, status=404)
+
+
+class ShopsStatsAPIView(APIView):
+    serializer_class = ShopStatsSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdCursorPagination
+
+    @extend_schema(
+        operation_id="shops_stats",
+        summary="Get the offer statistics of the shops",
+        description="This endpoint allows user to get the number of offers, "
+        "units and value in stock, prices and out of stock offers of every shop",
+        parameters=SHOP_STATS_PARAM_EXAMPLE,
+    )
+    def get(self, request):
+        filterset = ShopStatsFilter(request.query_params, queryset=Shop.objects.all())
+
+        if filterset.is_valid():
+            shops = annotate_stats(
+                filterset.qs,
+                filterset.form.cleaned_data.get("category"),
+                filterset.form.cleaned_data.get("include_descendants"),
+            )
+
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(shops, request, view=self)
+            serializer = self.serializer_class(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        return Response(filterset.errors, status=400)
+
+
+class ShopStatsAPIView(APIView):
+    serializer_class = ShopStatsSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        operation_id="shop_stats",
+        summary="Get the offer statistics of the shop",
+        description="This endpoint allows user to get the offer statistics "
+        "of a shop using id",
+        parameters=SHOP_STATS_OFFERS_PARAM_EXAMPLE,
+    )
+    def get(self, request, *args, **kwargs):
+        filterset = ShopStatsFilter(request.query_params, queryset=Shop.objects.all())
+
+        if filterset.is_valid():
+            shops = annotate_stats(
+                Shop.objects.filter(id=kwargs["id"]),
+                filterset.form.cleaned_data.get("category"),
+                filterset.form.cleaned_data.get("include_descendants"),
+            )
+            shop = shops.first()
+
+            if shop is not None:
+                serializer = self.serializer_class(shop)
+                return Response(data=serializer.data, status=200)
+
+            return Response(
+                data={"message": "Shop with that identifier does not exist!"}
+            )
+        return Response(filterset.errors, status=400)
+
+
+class AsyncShopsView(AsyncAPIView):
+    async def get(self, request):
+        shops = Shop.objects.prefetch_related("responsible_id")
+
+        filterset = ShopFilter(request.GET, queryset=shops)
+        if filterset.is_valid():
+            return await self.paginate(request, filterset.qs, ShopSerializer)
+        return self.render(filterset.errors, status=400)
+
+
+class AsyncShopView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        version = await aget_version("shop", kwargs["id"])
+        data = await aget_cached_detail("shop", kwargs["id"], version)
+        if data is not None:
+            return self.render(data)
+
+        try:
+            shop = await Shop.objects.prefetch_related("responsible_id").aget(
+                id=kwargs["id"]
+            )
+        except Shop.DoesNotExist:
+            return self.render({"message": "Shop with that identifier does not exist!"})
+
+        data = ShopSerializer(shop).data
+        await aset_cached_detail("shop", kwargs["id"], version, data)
+        return self.render(data)
@@ -0,0 +1,146 @@
+"""
+Compares the sync endpoints with their async versions at high concurrency
+
+Start the project under the server to measure, for example
+
+    gunicorn core.wsgi -w 4 --threads 8           # WSGI
+    uvicorn core.asgi:application --workers 4     # ASGI
+
+log in once to get a session cookie and run
+
+    python benchmarks/async_views.py --base-url http://127.0.0.1:8000 \\
+        --sessionid <cookie> --concurrency 200 --requests 5000
+
+Every endpoint pair (sync path, async path) is hit with the same number of
+keep-alive connections and the results are printed as JSON: requests per
+second, latency percentiles in milliseconds and the number of failed
+requests. Only the standard library is used, so the script runs anywhere
+the project does.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = [
+    ("/products/", "/async/products/"),
+    ("/shops/", "/shops/async/"),
+]
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by the server")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+
+    return status, headers.get("connection") == "close"
+
+
+async def worker(url, cookie, remaining, latencies, failures):
+    parts = urlsplit(url)
+    request = (
+        f"GET {parts.path}?{parts.query} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        f"Cookie: sessionid={cookie}\r\n"
+        "Accept: application/json\r\n\r\n"
+    ).encode()
+    connection = None
+
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        if connection is None:
+            connection = await asyncio.open_connection(parts.hostname, parts.port or 80)
+        reader, writer = connection
+
+        started = time.perf_counter()
+        try:
+            writer.write(request)
+            status, closed = await read_response(reader)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            failures.append(None)
+            writer.close()
+            connection = None
+            continue
+
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            failures.append(status)
+        if closed:
+            writer.close()
+            connection = None
+
+    if connection is not None:
+        connection[1].close()
+
+
+async def measure(url, cookie, concurrency, requests):
+    remaining = [requests]
+    latencies = []
+    failures = []
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            worker(url, cookie, remaining, latencies, failures)
+            for _ in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return {
+        "url": url,
+        "requests": len(latencies),
+        "failed": len(failures),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2) if quantiles else None,
+        "p95_ms": round(quantiles[94] * 1000, 2) if quantiles else None,
+        "p99_ms": round(quantiles[98] * 1000, 2) if quantiles else None,
+    }
+
+
+async def main(options):
+    results = []
+
+    for sync_path, async_path in ENDPOINTS:
+        pair = {}
+        for name, path in (("sync", sync_path), ("async", async_path)):
+            url = f"{options.base_url.rstrip('/')}{path}?page_size={options.page_size}"
+            # A short warm-up opens the connections and warms up the server
+            await measure(
+                url, options.sessionid, options.concurrency, options.concurrency
+            )
+            pair[name] = await measure(
+                url, options.sessionid, options.concurrency, options.requests
+            )
+        results.append(pair)
+
+    print(
+        json.dumps({"concurrency": options.concurrency, "results": results}, indent=2)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessionid", required=True)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
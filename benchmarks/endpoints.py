@@ -0,0 +1,326 @@
+"""
+Benchmarks every read endpoint of core/urls.py on a seeded test database
+
+    python benchmarks/endpoints.py --dataset 100k --database postgresql \\
+        --requests 50 --output before.json
+
+A test database is created (``--database sqlite`` keeps it in memory,
+``postgresql`` uses the connection settings of the project), seeded with
+the chosen dataset and every endpoint is requested through the Django test
+client as a logged in superuser. For every endpoint the result has the
+latency percentiles in milliseconds, the SQL queries per request, the peak
+Python memory of one request and the size of the body, and the endpoints
+over their query budget are listed. The JSON output is meant to be diffed
+between commits; with ``--check-budgets`` the exit status is 1 when a
+budget is exceeded.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("QUERY_LOG_LEVEL", "WARNING")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DATASETS = {
+    "1k": {
+        "shops": 20,
+        "products": 1_000,
+        "responsibles_per_shop": 3,
+        "categories_depth": 3,
+        "categories_width": 3,
+    },
+    "100k": {
+        "shops": 200,
+        "products": 100_000,
+        "responsibles_per_shop": 20,
+        "categories_depth": 5,
+        "categories_width": 4,
+    },
+    "1m": {
+        "shops": 1_000,
+        "products": 1_000_000,
+        "responsibles_per_shop": 50,
+        "categories_depth": 6,
+        "categories_width": 4,
+    },
+}
+
+# Queries per request an endpoint may not exceed, whatever the dataset. They
+# include the session and user lookups of the authentication (two queries)
+# and the version lookup of the cached and conditional endpoints, and are
+# checked with the detail cache warm
+QUERY_BUDGETS = {
+    "products": 5,
+    "products-sparse": 4,
+    "products-search": 5,
+    "products-category-subtree": 5,
+    "product": 3,
+    "categories": 5,
+    "category": 3,
+    "shops": 5,
+    "shops-count": 4,
+    "shop": 3,
+    "shops-stats": 3,
+    "shop-stats": 3,
+    "async-products": 4,
+    "async-product": 3,
+    "async-shops": 4,
+    "async-shop": 3,
+    "profiles": 3,
+    "profile": 3,
+    "myprofile": 2,
+}
+
+# Endpoints of core/urls.py that are not benchmarked and why
+NOT_BENCHMARKED = {
+    "signup": "writes",
+    "signup-bulk": "writes",
+    "token": "writes",
+    "products-bulk": "writes",
+    "catalog-export": "reads the whole catalog, see export_catalog",
+    "metrics": "depends on prometheus_client",
+    "schema": "static",
+    "swagger-ui": "static",
+}
+
+
+def setup(options):
+    if options.database == "sqlite":
+        settings.DATABASES = {
+            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+        }
+    django.setup()
+
+
+def get_endpoints():
+    """
+    Returns (label, url name, URL arguments, query parameters) of every
+    benchmarked request, the ids are taken from the seeded data
+    """
+    from apps.accounts.models import User
+    from apps.goods.models import Category, Product
+    from apps.shop.models import Shop
+
+    product = Product.objects.order_by("pk").first()
+    shop = Shop.objects.order_by("pk").first()
+    root = Category.objects.filter(parent=None).order_by("pk").first()
+    leaf = Category.objects.order_by("-depth", "pk").first()
+    responsible = User.objects.filter(role="RESP").order_by("pk").first()
+
+    return [
+        ("products", "products", {}, {}),
+        ("products-sparse", "products", {}, {"fields": "id,price,product.title"}),
+        ("products-search", "products", {}, {"title": "phone 12"}),
+        (
+            "products-category-subtree",
+            "products",
+            {},
+            {"category": root.pk, "include_descendants": "true"},
+        ),
+        ("product", "product", {"id": product.pk}, {}),
+        ("categories", "categories", {}, {}),
+        ("category", "category", {"id": leaf.pk}, {}),
+        ("shops", "shops", {}, {}),
+        ("shops-count", "shops", {}, {"responsibles": "count"}),
+        ("shop", "shop", {"id": shop.pk}, {}),
+        ("shops-stats", "shops-stats", {}, {}),
+        ("shop-stats", "shop-stats", {"id": shop.pk}, {}),
+        ("async-products", "async-products", {}, {}),
+        ("async-product", "async-product", {"id": product.pk}, {}),
+        ("async-shops", "async-shops", {}, {}),
+        ("async-shop", "async-shop", {"id": shop.pk}, {}),
+        ("profiles", "profiles", {}, {}),
+        ("profile", "profile", {"email": responsible.email}, {}),
+        ("myprofile", "myprofile", {}, {}),
+    ]
+
+
+def get_uncovered(endpoints):
+    """
+    Returns the named URLs of the project that are neither benchmarked
+    nor listed in NOT_BENCHMARKED, so new endpoints are not forgotten
+    """
+    from django.urls import URLPattern, get_resolver
+
+    def names(patterns, namespace=None):
+        for pattern in patterns:
+            if isinstance(pattern, URLPattern):
+                if pattern.name and namespace is None:
+                    yield pattern.name
+            else:
+                yield from names(pattern.url_patterns, pattern.namespace or namespace)
+
+    covered = {name for _, name, _, _ in endpoints} | set(NOT_BENCHMARKED)
+    return sorted(set(names(get_resolver().url_patterns)) - covered)
+
+
+def request(client, url, params):
+    response = client.get(url, params)
+    # Streamed bodies run their queries while they are read
+    if response.streaming:
+        body = b"".join(response.streaming_content)
+    else:
+        body = response.content
+    return response, body
+
+
+def measure(client, url, params, options):
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(options.warmup):
+        request(client, url, params)
+
+    latencies = []
+    queries = []
+    for _ in range(options.requests):
+        if options.cold_cache:
+            caches[settings.DETAIL_CACHE_ALIAS].clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response, body = request(client, url, params)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(context.captured_queries))
+
+    # Measured apart, tracing the allocations slows the requests down
+    tracemalloc.start()
+    request(client, url, params)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "url": url,
+        "params": params,
+        "status": response.status_code,
+        "requests": len(latencies),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "queries": max(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "response_bytes": len(body),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(options):
+    setup(options)
+
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.urls import reverse
+
+    from apps.accounts.models import User
+    from apps.goods.models import Product
+    from apps.goods.seeding import seed_catalog
+
+    dataset = DATASETS[options.dataset]
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, keepdb=options.keepdb)
+
+    try:
+        seed_seconds = None
+        if not Product.objects.exists():
+            _, seed_seconds = seed_catalog(**dataset, seed=options.seed)
+            seed_seconds = round(seed_seconds, 1)
+
+        superuser = User.objects.filter(email="benchmark@example.com").first()
+        if superuser is None:
+            superuser = User.objects.create_superuser(
+                "Bench", "Mark", "benchmark@example.com", "benchmark"
+            )
+        client = Client()
+        client.force_login(superuser)
+
+        endpoints = get_endpoints()
+        results = {}
+        for label, name, kwargs, params in endpoints:
+            params = {"page_size": options.page_size, **params}
+            url = reverse(name, kwargs=kwargs)
+            results[label] = measure(client, url, params, options)
+            print(f"{label}: {results[label]['p50_ms']} ms", file=sys.stderr)
+
+        over_budget = {
+            label: result["queries"]
+            for label, result in results.items()
+            if not options.cold_cache
+            and result["queries"] > QUERY_BUDGETS.get(label, result["queries"])
+        }
+        report = {
+            "commit": get_commit(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "dataset": {"name": options.dataset, **dataset},
+            "seed_seconds": seed_seconds,
+            "cold_cache": options.cold_cache,
+            "results": results,
+            "over_budget": over_budget,
+            "not_benchmarked": NOT_BENCHMARKED,
+            "uncovered": get_uncovered(endpoints),
+        }
+    finally:
+        if not options.keepdb:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    return 1 if options.check_budgets and over_budget else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dataset", choices=DATASETS, default="1k")
+    parser.add_argument(
+        "--database", choices=("sqlite", "postgresql"), default="sqlite"
+    )
+    parser.add_argument(
+        "--keepdb",
+        action="store_true",
+        help="Keep the seeded test database and reuse it on the next run",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument(
+        "--cold-cache",
+        action="store_true",
+        help="Clear the detail cache before every request",
+    )
+    parser.add_argument("--output", help="File to write the JSON report to")
+    parser.add_argument("--check-budgets", action="store_true")
+    sys.exit(main(parser.parse_args()))
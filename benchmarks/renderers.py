@@ -0,0 +1,104 @@
+"""
+Compares DRF's stdlib JSONRenderer with ORJSONRenderer on product lists
+
+    python benchmarks/renderers.py --rows 10000 --repeat 20
+
+The payload has the shape of a /products/ page (nested product, shop and
+responsibles, Decimal prices rendered as strings) and no database is
+needed. The median rendering time of every renderer and the speedup are
+printed as JSON.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.renderers import ORJSONRenderer, orjson  # noqa: E402
+
+
+def make_page(rows):
+    responsibles = [
+        {
+            "id": i,
+            "first_name": f"Имя {i}",
+            "last_name": "Фамилия",
+            "email": f"user{i}@example.com",
+            "is_active": True,
+            "role": "RESP",
+        }
+        for i in range(3)
+    ]
+    return {
+        "next": "http://testserver/products/?cursor=cD0xMDAwMA%3D%3D",
+        "previous": None,
+        "results": [
+            {
+                "id": i,
+                "product": {
+                    "id": i,
+                    "title": f"Product {i}",
+                    "desc": "Описание товара " * 5,
+                    "image": f"/media/products_images/{i}.png",
+                },
+                "shop": {
+                    "id": i % 100,
+                    "responsible_id": responsibles,
+                    "title": f"Shop {i % 100}",
+                    "desc": "Shop description",
+                    "is_active": True,
+                    "image": None,
+                },
+                "price": f"{i / 7:.2f}",
+                "in_stock": i,
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+def measure(renderer, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        renderer.render(data)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    options = parser.parse_args()
+
+    data = make_page(options.rows)
+    if JSONRenderer().render(data) != ORJSONRenderer().render(data):
+        sys.exit("The renderers disagree on the payload")
+
+    stdlib = measure(JSONRenderer(), data, options.repeat)
+    fast = measure(ORJSONRenderer(), data, options.repeat)
+    print(
+        json.dumps(
+            {
+                "rows": options.rows,
+                "orjson": orjson.__version__ if orjson else None,
+                "json_renderer_ms": round(stdlib * 1000, 2),
+                "orjson_renderer_ms": round(fast * 1000, 2),
+                "speedup": round(stdlib / fast, 1),
+            },
+            indent=2,
+        )
+    )
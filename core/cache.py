@@ -0,0 +1,196 @@
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Concat
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from apps.goods.models import ResourceVersion, ShopProduct
+from core.metrics import observe_cache_lookup
+
+# Marker moved by invalidate_all(), every other marker is at least this one
+ALL_VERSIONS_KEY = "all"
+VERSION_BATCH_SIZE = 1000
+
+
+def get_detail_cache():
+    return caches[settings.DETAIL_CACHE_ALIAS]
+
+
+def make_detail_key(kind, pk, version):
+    # A change moves the version, so the payloads of other versions are
+    # never read again, in any process, and expire with their timeout
+    return f"detail:{kind}:{pk}:{version}"
+
+
+def make_version_key(kind, pk=None):
+    return f"{kind}:{'list' if pk is None else pk}"
+
+
+def get_cached_detail(kind, pk, version):
+    """
+    Returns the rendered payload of a detail endpoint at the given version,
+    or None on a miss
+    """
+    data = get_detail_cache().get(make_detail_key(kind, pk, version))
+    observe_cache_lookup(kind, data is not None)
+    return data
+
+
+def set_cached_detail(kind, pk, version, data):
+    get_detail_cache().set(
+        make_detail_key(kind, pk, version), data, settings.DETAIL_CACHE_TIMEOUT
+    )
+
+
+async def aget_cached_detail(kind, pk, version):
+    data = await get_detail_cache().aget(make_detail_key(kind, pk, version))
+    observe_cache_lookup(kind, data is not None)
+    return data
+
+
+async def aset_cached_detail(kind, pk, version, data):
+    await get_detail_cache().aset(
+        make_detail_key(kind, pk, version), data, settings.DETAIL_CACHE_TIMEOUT
+    )
+
+
+def get_shop_version_keys(product_id):
+    return ShopProduct.objects.filter(product_id=product_id).values(
+        key=Concat(Value("shop:"), "shop_id", output_field=CharField())
+    )
+
+
+# Objects embedded in the payload of another kind: a product shows the shop
+# of its offer with the responsibles. Their markers are read with the one of
+# the object, so a change of a shop never has to touch its products
+VERSION_DEPENDENCIES = {
+    "product": get_shop_version_keys,
+}
+
+
+def get_version_queryset(kind, pk):
+    keys = Q(key__in=[make_version_key(kind, pk), ALL_VERSIONS_KEY])
+    if pk is not None and kind in VERSION_DEPENDENCIES:
+        keys |= Q(key__in=VERSION_DEPENDENCIES[kind](pk))
+    return ResourceVersion.objects.filter(keys).values_list("key", "version")
+
+
+def resolve_version(versions):
+    if ALL_VERSIONS_KEY not in versions:
+        # Not written yet or lost: starting at the current time can only
+        # cause full responses, never a stale 304
+        versions[ALL_VERSIONS_KEY] = set_versions([ALL_VERSIONS_KEY])
+    return max(versions.values())
+
+
+def get_version(kind, pk=None):
+    """
+    Returns the version marker of an object, or of the whole list when pk
+    is None: the time of its last change in microseconds
+
+    The markers are rows of ResourceVersion read by primary key in one
+    query, so every worker process sees the same versions. An object
+    without a marker of its own has not changed since invalidate_all().
+    The markers of VERSION_DEPENDENCIES are read in the same query.
+    """
+    return resolve_version(dict(get_version_queryset(kind, pk)))
+
+
+async def aget_version(kind, pk=None):
+    versions = {key: version async for key, version in get_version_queryset(kind, pk)}
+    if ALL_VERSIONS_KEY not in versions:
+        return await sync_to_async(resolve_version)(versions)
+    return resolve_version(versions)
+
+
+def get_request_version(request, kind, pk=None):
+    # Read once per request, by the conditional GET and the detail cache
+    attr = f"_version_{kind}_{pk}"
+    if not hasattr(request, attr):
+        setattr(request, attr, get_version(kind, pk))
+    return getattr(request, attr)
+
+
+def set_versions(keys):
+    version = time.time_ns() // 1000
+    # Rows are locked in key order, so concurrent upserts cannot deadlock
+    ResourceVersion.objects.bulk_create(
+        [ResourceVersion(key=key, version=version) for key in sorted(set(keys))],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["version"],
+        batch_size=VERSION_BATCH_SIZE,
+    )
+    return version
+
+
+def invalidate_details(kind, pks):
+    """
+    Moves the version markers of the given objects and of their list, so
+    their cached payloads and ETags are replaced
+
+    Called from model signals, so every write that goes through the ORM
+    (serializers, PATCH endpoints, the admin) keeps the cache consistent.
+    Bulk ``QuerySet.update()`` calls do not send signals and have to
+    call this themselves. The markers are written in the transaction of
+    the change, so they move when it commits.
+    """
+    keys = {make_version_key(kind, pk) for pk in pks}
+    if keys:
+        set_versions({*keys, make_version_key(kind)})
+
+
+def invalidate_lists(*kinds):
+    """
+    Moves the version markers of whole lists, for changes that alter which
+    rows a filtered list returns without changing any of its objects
+    """
+    set_versions([make_version_key(kind) for kind in kinds])
+
+
+def invalidate_all():
+    """
+    Moves every version marker at once, used after imports that change
+    too many objects to invalidate one by one
+
+    The per-object markers are dropped and the "all" marker, which every
+    version is at least, restarts at the current time. Clients get full
+    responses again and the old cached payloads are not read any more.
+    """
+    ResourceVersion.objects.exclude(key=ALL_VERSIONS_KEY).delete()
+    set_versions([ALL_VERSIONS_KEY])
+
+
+def versioned_resource(kind, pk_kwarg=None):
+    """
+    Adds conditional GET support to an APIView handler
+
+    The weak ETag and Last-Modified come from the version marker of the
+    object (``pk_kwarg`` names the URL argument holding its id) or of the
+    list, so ``If-None-Match``/``If-Modified-Since`` are answered with a
+    304 after a single primary key lookup, before the queryset runs.
+    """
+
+    def get_request_version_of(request, **kwargs):
+        pk = kwargs.get(pk_kwarg) if pk_kwarg else None
+        return pk, get_request_version(request, kind, pk)
+
+    def etag_func(request, *args, **kwargs):
+        pk, version = get_request_version_of(request, **kwargs)
+        # The same URL can be rendered as JSON, NDJSON or the browsable API
+        renderer_format = request.accepted_renderer.format
+        target = "list" if pk is None else pk
+        return f'W/"{kind}-{target}-{version}-{renderer_format}"'
+
+    def last_modified_func(request, *args, **kwargs):
+        _, version = get_request_version_of(request, **kwargs)
+        return datetime.fromtimestamp(version / 1_000_000, tz=timezone.utc)
+
+    return method_decorator(
+        condition(etag_func=etag_func, last_modified_func=last_modified_func)
+    )
@@ -0,0 +1,15 @@
+import os
+
+from django.core.management.base import CommandError
+
+
+def guess_format(path):
+    """
+    Returns the format of a data file, "csv" or "ndjson", from its extension
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise CommandError("Cannot guess the format of the file, pass --format")
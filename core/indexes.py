@@ -0,0 +1,82 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models import Index
+from django.db.models.functions import Upper
+
+
+class UpperOpClassIndexMixin:
+    """
+    Index over ``UPPER(field)`` with the operator class ``opclass``
+
+    ``UPPER(field)`` is the expression Django compares in case-insensitive
+    lookups on PostgreSQL, so those lookups use the index. Other backends
+    (SQLite in local test runs) get a plain expression index instead,
+    which keeps migrations and table rebuilds working there.
+    """
+
+    opclass = None
+
+    def __init__(self, field_name, *, name):
+        self.field_name = field_name
+        super().__init__(
+            OpClass(Upper(field_name), name=self.opclass),
+            name=name,
+        )
+
+    def deconstruct(self):
+        path, _, kwargs = super().deconstruct()
+        return path, (self.field_name,), kwargs
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+        fallback = Index(Upper(self.field_name), name=self.name)
+        return fallback.create_sql(model, schema_editor, **kwargs)
+
+
+class TrigramIndex(UpperOpClassIndexMixin, GinIndex):
+    """
+    GIN index over ``UPPER(field)`` with the ``gin_trgm_ops`` operator
+    class, used by ``icontains`` lookups and trigram similarity searches
+    """
+
+    opclass = "gin_trgm_ops"
+
+
+class PrefixIndex(UpperOpClassIndexMixin, Index):
+    """
+    B-tree index over ``UPPER(field)`` with the ``varchar_pattern_ops``
+    operator class
+
+    ``istartswith`` lookups compare ``UPPER(field) LIKE UPPER('prefix%')``
+    and with the pattern operator class a B-tree serves such left-anchored
+    patterns whatever the collation of the database. Smaller and cheaper
+    to update than a trigram index, but only for prefixes.
+    """
+
+    opclass = "varchar_pattern_ops"
+
+
+class PatternOpsIndex(Index):
+    """
+    B-tree index over a text column with the ``text_pattern_ops`` operator
+    class
+
+    Serves ``startswith`` lookups whatever the collation of the database.
+    Other backends get a plain index on the column.
+    """
+
+    def __init__(self, field_name, *, name):
+        self.field_name = field_name
+        super().__init__(OpClass(field_name, name="text_pattern_ops"), name=name)
+
+    def deconstruct(self):
+        path, _, kwargs = super().deconstruct()
+        return path, (self.field_name,), kwargs
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+        fallback = Index(fields=[self.field_name], name=self.name)
+        return fallback.create_sql(model, schema_editor, **kwargs)
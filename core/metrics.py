@@ -0,0 +1,117 @@
+"""
+Prometheus metrics of the API
+
+Needs prometheus_client; without it nothing is recorded and /metrics
+answers 404. With several worker processes set PROMETHEUS_MULTIPROC_DIR to
+an empty directory shared by the workers (cleared on every deploy) before
+they start: each process then writes its samples to memory-mapped files
+there and /metrics aggregates them, whichever worker serves the scrape.
+Under gunicorn also call ``prometheus_client.multiprocess.mark_process_dead``
+from the ``child_exit`` hook.
+"""
+
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+if prometheus_client is not None:
+    REQUESTS = prometheus_client.Counter(
+        "http_requests",
+        "Requests by resolved URL name, method and status",
+        ["view", "method", "status"],
+    )
+    LATENCY = prometheus_client.Histogram(
+        "http_request_duration_seconds",
+        "Time spent handling the request",
+        ["view", "method"],
+    )
+    RESPONSE_SIZE = prometheus_client.Histogram(
+        "http_response_size_bytes",
+        "Size of the response bodies, streamed ones are not measured",
+        ["view", "method"],
+        buckets=SIZE_BUCKETS,
+    )
+    DB_QUERIES = prometheus_client.Histogram(
+        "http_request_db_queries",
+        "SQL queries run by the request",
+        ["view", "method"],
+        buckets=QUERY_BUCKETS,
+    )
+    DB_DURATION = prometheus_client.Histogram(
+        "http_request_db_duration_seconds",
+        "Time spent in SQL queries by the request",
+        ["view", "method"],
+    )
+    DETAIL_CACHE = prometheus_client.Counter(
+        "detail_cache_lookups",
+        "Lookups of cached detail payloads by kind and result (hit or miss)",
+        ["kind", "result"],
+    )
+
+
+def get_view_name(request):
+    # URL names keep the label set small, unmatched paths share one label
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unmatched"
+
+
+def observe_request(request, response, duration, queries, db_duration):
+    view = get_view_name(request)
+    method = request.method
+
+    REQUESTS.labels(view, method, response.status_code).inc()
+    LATENCY.labels(view, method).observe(duration)
+    DB_QUERIES.labels(view, method).observe(queries)
+    DB_DURATION.labels(view, method).observe(db_duration)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(view, method).observe(len(response.content))
+
+
+def observe_cache_lookup(kind, hit):
+    if prometheus_client is not None:
+        DETAIL_CACHE.labels(kind, "hit" if hit else "miss").inc()
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return prometheus_client.REGISTRY
+
+    # A fresh registry per scrape, the collector reads the files of all workers
+    registry = prometheus_client.CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """
+    Serves the metrics in the Prometheus text format
+
+    The scraper has to send METRICS_TOKEN as a bearer token, without the
+    setting the endpoint is not served at all.
+    """
+    if prometheus_client is None:
+        raise Http404("prometheus_client is not installed")
+
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404("METRICS_TOKEN is not set")
+    if not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+
+    return HttpResponse(
+        prometheus_client.generate_latest(get_registry()),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
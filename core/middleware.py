@@ -0,0 +1,191 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import metrics
+
+logger = logging.getLogger("core.queries")
+
+SLOW_QUERY_MAX_LENGTH = 500
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts the queries of a request, sums
+    their time and keeps the slowest one
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = None
+        self.slowest_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if duration >= self.slowest_duration:
+                self.slowest_sql = sql
+                self.slowest_duration = duration
+
+
+# Recorders of the request running in the current context. Concurrent
+# requests under ASGI share the connections of the sync thread, the context
+# tells their queries apart
+active_recorders = ContextVar("active_recorders", default=())
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed once on every connection, passes the query
+    to the recorders of the request it runs for
+    """
+    for recorder in active_recorders.get():
+        execute = partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_recording():
+    for connection in connections.all():
+        if record_query not in connection.execute_wrappers:
+            # First, so the wrappers pushed and popped by execute_wrapper()
+            # never remove it
+            connection.execute_wrappers.insert(0, record_query)
+
+
+class RecordingMiddleware:
+    """
+    Base of the middlewares that run the requests they measure with a
+    QueryRecorder
+
+    Subclasses pick the requests with ``measure()`` and get the recorder
+    and the duration of the request in ``report()``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.measure(request):
+            return self.get_response(request)
+
+        install_query_recording()
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = active_recorders.set((*active_recorders.get(), recorder))
+        try:
+            response = self.get_response(request)
+        finally:
+            active_recorders.reset(token)
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.measure(request):
+            return await self.get_response(request)
+
+        # The async ORM runs its queries on the connections of the sync
+        # thread, the wrapper is installed there
+        await sync_to_async(install_query_recording)()
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = active_recorders.set((*active_recorders.get(), recorder))
+        try:
+            response = await self.get_response(request)
+        finally:
+            active_recorders.reset(token)
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def measure(self, request):
+        return True
+
+    def report(self, request, response, recorder, duration):
+        raise NotImplementedError
+
+
+class QueryInstrumentationMiddleware(RecordingMiddleware):
+    """
+    Measures the database work of sampled requests
+
+    A share of the requests set by QUERY_INSTRUMENTATION_SAMPLE_RATE is
+    measured. The response gets ``Server-Timing`` (db, app and total
+    durations) and ``X-DB-Queries`` headers, and one line is logged to
+    ``core.queries`` with the same figures and the slowest query. Queries
+    of a streamed body run after the response is returned and are not
+    counted.
+    """
+
+    def measure(self, request):
+        rate = settings.QUERY_INSTRUMENTATION_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def report(self, request, response, recorder, duration):
+        db_ms = recorder.duration * 1000
+        total_ms = duration * 1000
+        app_ms = max(total_ms - db_ms, 0.0)
+
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+            f"app;dur={app_ms:.1f}, total;dur={total_ms:.1f}"
+        )
+        response["X-DB-Queries"] = str(recorder.count)
+
+        slowest_sql = recorder.slowest_sql
+        if slowest_sql is not None:
+            slowest_sql = slowest_sql[:SLOW_QUERY_MAX_LENGTH]
+        figures = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "db_queries": recorder.count,
+            "db_ms": round(db_ms, 1),
+            "app_ms": round(app_ms, 1),
+            "total_ms": round(total_ms, 1),
+            "slowest_ms": round(recorder.slowest_duration * 1000, 1),
+            "slowest_sql": slowest_sql,
+        }
+        logger.info(
+            " ".join(f"{name}=%r" for name in figures),
+            *figures.values(),
+            extra=figures,
+        )
+
+
+class MetricsMiddleware(RecordingMiddleware):
+    """
+    Records every request in the Prometheus metrics of core.metrics:
+    count, latency, response size and SQL queries per resolved URL name
+
+    Not loaded without prometheus_client.
+    """
+
+    def __init__(self, get_response):
+        if metrics.prometheus_client is None:
+            raise MiddlewareNotUsed("prometheus_client is not installed")
+        super().__init__(get_response)
+
+    def report(self, request, response, recorder, duration):
+        metrics.observe_request(
+            request, response, duration, recorder.count, recorder.duration
+        )
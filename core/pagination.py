@@ -0,0 +1,88 @@
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination ordered by the primary key
+
+    The opaque cursor only carries the last seen id, so every page is a
+    single range scan over the primary key index and rows inserted while
+    a client is paging never shift the pages it has already received.
+    Title searches ranked by relevance are the exception, see below.
+    """
+
+    ordering = "id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    # Ranked searches are paged by offset and stop after this many rows
+    search_offset_cutoff = 10_000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ranked = "search_rank" in queryset.query.annotations
+        if not self.ranked:
+            return super().paginate_queryset(queryset, request, view)
+
+        # Ranks tie heavily and the cursor of CursorPagination only keeps
+        # the first ordering field, so title searches are paged by offset in
+        # the same opaque cursor. They sort every match by rank anyway.
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.offset_cutoff = self.search_offset_cutoff
+        self.ordering = ("-search_rank", "id")
+
+        cursor = self.decode_cursor(request)
+        self.offset = cursor.offset if cursor else 0
+
+        results = list(
+            queryset.order_by(*self.ordering)[
+                self.offset : self.offset + self.page_size + 1
+            ]
+        )
+        self.page = results[: self.page_size]
+        self.has_next = (
+            len(results) > self.page_size
+            and self.offset + self.page_size <= self.search_offset_cutoff
+        )
+        self.has_previous = self.offset > 0
+        return self.page
+
+    def get_next_link(self):
+        if not self.ranked:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=self.offset + self.page_size, reverse=False, position=None)
+        )
+
+    def get_previous_link(self):
+        if not self.ranked:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(
+                offset=max(self.offset - self.page_size, 0),
+                reverse=False,
+                position=None,
+            )
+        )
+
+
+CURSOR_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="cursor",
+        description="Opaque cursor taken from the next/previous link of a page",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+    OpenApiParameter(
+        name="page_size",
+        description=f"Number of results per page (max {IdCursorPagination.max_page_size})",
+        required=False,
+        type=OpenApiTypes.INT,
+    ),
+]
@@ -0,0 +1,84 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    (
+        orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+        | orjson.OPT_NON_STR_KEYS
+    )
+    if orjson
+    else 0
+)
+
+
+JSON_ENCODER = JSONEncoder()
+
+
+def encode_default(obj):
+    # orjson reads the storage of list and dict subclasses directly, which
+    # is empty for ErrorList (a UserList), so subclasses come here and are
+    # copied through their own iteration, as the stdlib encoder reads them
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, list):
+        return list(obj)
+    return JSON_ENCODER.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson
+
+    Produces the same bytes as DRF's renderer: subclasses of the builtin
+    types, datetimes, Decimals, lazy strings and the other types orjson
+    does not take as they are go through encode_default, and U+2028/U+2029
+    are escaped. Indented output (the browsable API) and installs without
+    orjson fall back to the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        # Same escaping as DRF, the two separators are not valid in JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028")
+            ret = ret.replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """
+    Newline-delimited JSON renderer
+
+    Lets clients negotiate ``application/x-ndjson`` on list endpoints;
+    those views answer with a streamed response, anything else is
+    rendered as one JSON document per list item.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        render = super().render
+
+        if not isinstance(data, list):
+            return render(data, accepted_media_type, renderer_context) + b"\n"
+
+        return b"".join(
+            render(item, accepted_media_type, renderer_context) + b"\n" for item in data
+        )
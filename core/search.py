@@ -0,0 +1,22 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+
+
+def search_by_title(queryset, field_name, value):
+    """
+    Filters the queryset by a substring of ``field_name``
+
+    On PostgreSQL the ``icontains`` lookup is served by the
+    ``gin_trgm_ops`` index on ``UPPER(title)`` and every row gets a
+    ``search_rank`` annotation (trigram word similarity), which the
+    cursor pagination uses to return the best matches first. Other
+    backends fall back to a plain ``icontains`` scan ordered by id.
+    """
+    queryset = queryset.filter(**{f"{field_name}__icontains": value})
+
+    if connections[queryset.db].vendor == "postgresql":
+        queryset = queryset.annotate(
+            search_rank=TrigramWordSimilarity(value, field_name)
+        )
+
+    return queryset
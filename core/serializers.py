@@ -0,0 +1,159 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import serializers
+
+
+def parse_field_paths(value):
+    """
+    Turns "id,product.title,shop" into {"id": {}, "product": {"title": {}},
+    "shop": {}}, or returns None when the parameter was not sent
+    """
+    if value is None:
+        return None
+
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in filter(None, path.strip().split(".")):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def get_sparse_fieldset(request):
+    """
+    Returns the serializer kwargs asked for with ``?fields=`` and ``?expand=``
+    """
+    return {
+        "fields": parse_field_paths(request.query_params.get("fields")),
+        "expand": parse_field_paths(request.query_params.get("expand")),
+    }
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that renders only the requested fields
+
+    ``fields`` keeps the listed fields, dotted paths select the fields of
+    nested serializers ("product.title"). ``expand`` lists the nested
+    serializers to render in full, the ones left out are rendered as their
+    primary keys. Both are trees built by ``parse_field_paths`` and None
+    (the default) keeps every field and expands everything, so a serializer
+    created without them renders as before.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.field_paths = kwargs.pop("fields", None)
+        self.expand_paths = kwargs.pop("expand", None)
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        if self.field_paths:
+            fields = {
+                name: field
+                for name, field in fields.items()
+                if name in self.field_paths
+            }
+
+        for name, field in fields.items():
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+
+            if self.expand_paths is not None and name not in self.expand_paths:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    source=field.source, many=many, read_only=True
+                )
+            elif isinstance(nested, SparseFieldsetMixin):
+                nested.field_paths = (self.field_paths or {}).get(name) or None
+                if self.expand_paths is not None:
+                    nested.expand_paths = self.expand_paths[name]
+
+        return fields
+
+
+def _plan_queryset(serializer, model, prefix, select, prefetch):
+    """
+    Collects the joins and prefetches the serializer needs into select and
+    prefetch, and returns the columns it reads or None if it reads
+    something that is not a model field
+    """
+    columns = [prefix + model._meta.pk.name]
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            columns = None
+            continue
+
+        path = prefix + field.source
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if not isinstance(nested, serializers.BaseSerializer):
+            nested = None
+
+        if model_field.many_to_many or model_field.one_to_many:
+            related = model_field.related_model
+            if nested is None:
+                queryset = related.objects.only(related._meta.pk.name)
+            else:
+                queryset = optimize_queryset(related.objects.all(), nested)
+            prefetch.append(Prefetch(path, queryset=queryset))
+        elif model_field.is_relation and nested is not None:
+            select.append(path)
+            nested_columns = _plan_queryset(
+                nested, model_field.related_model, path + "__", select, prefetch
+            )
+            if columns is not None and nested_columns is not None:
+                columns += [path, *nested_columns]
+            else:
+                columns = None
+        elif columns is not None:
+            columns.append(path)
+
+    return columns
+
+
+def optimize_queryset(queryset, serializer):
+    """
+    Restricts the queryset to what the serializer renders: the joins of
+    the expanded relations, prefetches of the many-to-many fields and,
+    when every rendered field is a model field, only their columns
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    select = []
+    prefetch = []
+    columns = _plan_queryset(serializer, queryset.model, "", select, prefetch)
+
+    queryset = queryset.select_related(*select) if select else queryset
+    queryset = queryset.prefetch_related(*prefetch)
+    if columns is not None:
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+SPARSE_FIELDSET_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="fields",
+        description="Comma separated fields to return, "
+        "dotted paths for nested ones (id,price,product.title)",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+    OpenApiParameter(
+        name="expand",
+        description="Comma separated nested objects to return in full "
+        "(product,shop,shop.responsible_id), the others are returned as ids. "
+        "Everything is expanded by default",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "drf_spectacular",
     "django_filters",
@@ -51,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",  # Метрики Prometheus по каждому запросу (/metrics)
+    "core.middleware.QueryInstrumentationMiddleware",  # Число и время SQL-запросов в заголовках и логе
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -97,6 +100,74 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# С REDIS_URL (например redis://localhost:6379/1) кэш пользователей токенов общий для всех воркеров
+REDIS_URL = os.getenv("REDIS_URL")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "auth": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "auth",
+        }
+        if REDIS_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "auth",
+        }
+    ),
+}
+
+# Кэш готовых ответов /products/<id>/, /shops/<id>/ и /categories/<id>/.
+# Ключи содержат версию объекта из таблицы goods_resourceversion, поэтому у каждого воркера может быть свой LocMem
+DETAIL_CACHE_ALIAS = "default"
+DETAIL_CACHE_TIMEOUT = 300
+
+# Доля запросов, для которых считаются SQL-запросы (0 — выключено, 1 — все запросы).
+# По умолчанию замеряется 1% запросов: в проде хватает выборки, для отладки задайте 1
+QUERY_INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv("QUERY_INSTRUMENTATION_SAMPLE_RATE", "0.01")
+)
+
+# Токен для /metrics (Authorization: Bearer <токен>), без него эндпоинт отвечает 404.
+# При нескольких воркерах задайте PROMETHEUS_MULTIPROC_DIR — общий каталог для метрик процессов
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # Строка на каждый замеренный запрос: метод, путь, число и время SQL-запросов.
+        # Пишется с уровнем INFO, поэтому без DEBUG по умолчанию не выводится
+        "core.queries": {
+            "handlers": ["console"],
+            "level": os.getenv("QUERY_LOG_LEVEL", "INFO" if DEBUG else "WARNING"),
+        },
+    },
+}
+
+
+# Токены /accounts/token/: срок жизни и кэш пользователей, чтобы запрос с токеном не ходил в БД.
+# Пользователь в кэше сбрасывается сигналами при деактивации и смене пароля. Без REDIS_URL у каждого
+# воркера свой кэш, и в остальных процессах отозванный токен действует ещё до AUTH_TOKEN_USER_CACHE_TIMEOUT секунд
+AUTH_TOKEN_MAX_AGE = 60 * 60 * 24
+AUTH_TOKEN_CACHE_ALIAS = "auth"
+AUTH_TOKEN_USER_CACHE_TIMEOUT = 30
+
+
+# Процессы для параллельного хеширования паролей при массовой регистрации (None — по числу ядер, 0 — без пула)
+PASSWORD_HASHING_WORKERS = None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -145,8 +216,19 @@ MEDIA_ROOT = BASE_DIR / "media"  # Папка для хранения загру
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",  # JSONRenderer на orjson
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "core.renderers.NDJSONRenderer",  # Потоковая выгрузка списков (?stream=ndjson)
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.ORJSONParser",  # JSONParser на orjson
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.SessionAuthentication",  # Аутентификация через сессии
+        "apps.accounts.authentication.TokenAuthentication",  # Подписанные токены без запросов к БД
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",  # Доступ только для аутентифицированных пользователей
@@ -0,0 +1,87 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+
+from core.renderers import NDJSONRenderer, ORJSONRenderer
+
+STREAM_CHUNK_SIZE = 1000
+
+
+def get_stream_format(request):
+    """
+    Returns "json" or "ndjson" if the client asked for a streamed
+    response (``?stream=1``, ``?stream=ndjson`` or a negotiated NDJSON
+    renderer), otherwise None
+    """
+    stream = request.query_params.get("stream", "").lower()
+    renderer = getattr(request, "accepted_renderer", None)
+
+    if stream == "ndjson" or isinstance(renderer, NDJSONRenderer):
+        return "ndjson"
+    if stream in ("1", "true", "json"):
+        return "json"
+    return None
+
+
+_renderer = ORJSONRenderer()
+
+
+def _iter_batches(queryset, serializer_class, chunk_size, serializer_kwargs):
+    rows = queryset.iterator(chunk_size=chunk_size)
+
+    while batch := list(islice(rows, chunk_size)):
+        yield serializer_class(batch, many=True, **serializer_kwargs).data
+
+
+def _iter_ndjson(batches):
+    for batch in batches:
+        yield b"".join(_renderer.render(item) + b"\n" for item in batch)
+
+
+def _iter_json_array(batches):
+    yield b"["
+    separator = b""
+    for batch in batches:
+        if batch:
+            yield separator + b",".join(_renderer.render(item) for item in batch)
+            separator = b","
+    yield b"]"
+
+
+def stream_response(
+    queryset,
+    serializer_class,
+    stream_format,
+    chunk_size=STREAM_CHUNK_SIZE,
+    serializer_kwargs=None,
+):
+    """
+    Serializes the queryset chunk by chunk into a streaming response
+
+    Rows are read through ``QuerySet.iterator`` (a server-side cursor on
+    PostgreSQL), so only ``chunk_size`` objects are held in memory at a
+    time no matter how many rows the queryset matches.
+    """
+    batches = _iter_batches(
+        queryset, serializer_class, chunk_size, serializer_kwargs or {}
+    )
+
+    if stream_format == "ndjson":
+        return StreamingHttpResponse(
+            _iter_ndjson(batches), content_type=NDJSONRenderer.media_type
+        )
+    return StreamingHttpResponse(
+        _iter_json_array(batches), content_type="application/json"
+    )
+
+
+STREAM_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="stream",
+        description="Stream every matching row without pagination: "
+        "1 for a JSON array, ndjson for newline-delimited JSON",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]